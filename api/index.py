@@ -3,17 +3,37 @@
 
 import os
 import sys
+from pathlib import Path
 
-# パスを追加してsrcモジュールをインポート可能にする
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# プロジェクトルート（srcモジュールをインポート可能にする）
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
 
 # 環境変数設定（Vercel用デフォルト）
-os.environ.setdefault("DEMO_MODE", "true")
-os.environ.setdefault("APP_DEBUG", "false")
-os.environ.setdefault("STRIPE_TEST_MODE", "true")
+_DEFAULTS = (
+    ("DEMO_MODE", "true"),
+    ("APP_DEBUG", "false"),
+    ("STRIPE_TEST_MODE", "true"),
+)
 
-from src.api.app import app
+sys.path.insert(0, _PROJECT_ROOT)
+for _key, _value in _DEFAULTS:
+    os.environ.setdefault(_key, _value)
 
 # Vercel Serverless Function用のハンドラー
-# Vercelは 'app' という名前のASGIアプリを自動検出
-handler = app
+# Vercelは 'app' / 'handler' という名前のASGIアプリを自動検出する。
+# アプリ本体は初回アクセス時に読み込む（PEP 562）
+_LAZY_NAMES = ("app", "handler")
+
+
+def __getattr__(name: str):
+    if name in _LAZY_NAMES:
+        from src.api.app import app
+
+        globals().update(app=app, handler=app)
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    # Vercelランタイムは dir() で 'app' / 'handler' の有無を判定するため公開する
+    return sorted(set(globals()) | set(_LAZY_NAMES))
@@ -7,6 +7,7 @@ Docker イメージのビルド、プッシュ、Cloud Run へのデプロイを
 
 使用方法:
     python scripts/deploy_cloudrun.py --project YOUR_PROJECT_ID
+    python scripts/deploy_cloudrun.py --project YOUR_PROJECT_ID --use-cloud-build
 
 前提条件:
     - gcloud CLI がインストール・認証済み
@@ -15,13 +16,51 @@ Docker イメージのビルド、プッシュ、Cloud Run へのデプロイを
 """
 
 import argparse
+import asyncio
+import functools
+import hashlib
 import json
 import os
+import re
 import subprocess
 import sys
 from pathlib import Path
 from typing import Optional
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _JSONDecodeError: type[ValueError] = orjson.JSONDecodeError
+except ImportError:
+    _json_loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
+# KEY=VALUE 形式の行（コメント行・空行は識別子で始まらないため一致しない）
+_ENV_RE = re.compile(r"^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*(.*?)[ \t]*$", re.M)
+
+# gcloud run deploy の進捗出力に含まれるURL
+_SERVICE_URL_RE = re.compile(r"Service URL: (https://\S+)")
+
+# 機密情報はSecret Managerで管理推奨
+_SECRET_KEYS = frozenset(
+    {
+        "GOOGLE_APPLICATION_CREDENTIALS",
+        "STRIPE_SECRET_KEY",
+        "STRIPE_WEBHOOK_SECRET",
+    }
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _read_env(path: Path, mtime_ns: int) -> tuple[tuple[str, str], ...]:
+    """.env を解析（mtime をキーに含めるため、更新時は再読み込みされる）"""
+    text = path.read_text(encoding="utf-8")
+    return tuple(
+        (key, value.strip('"').strip("'"))
+        for key, value in _ENV_RE.findall(text)
+        if key not in _SECRET_KEYS
+    )
+
 
 class CloudRunDeployer:
     """Cloud Run デプロイクラス"""
@@ -33,27 +72,58 @@ class CloudRunDeployer:
         service_name: str = "visioncraftai",
         memory: str = "2Gi",
         cpu: str = "2",
-        min_instances: int = 0,
+        min_instances: Optional[int] = None,
         max_instances: int = 10,
+        use_cloud_build: bool = False,
+        environment: Optional[str] = None,
     ):
         self.project_id = project_id
         self.region = region
         self.service_name = service_name
         self.memory = memory
         self.cpu = cpu
+        # 本番環境を明示した場合のみ、コールドスタートを避けるため最低1インスタンスを常駐させる
+        # （常駐インスタンスは課金対象のため、未指定時は従来どおり 0）
+        if min_instances is None:
+            min_instances = 1 if environment == "production" else 0
         self.min_instances = min_instances
         self.max_instances = max_instances
+        self.use_cloud_build = use_cloud_build
+        self.environment = environment or "production"
 
         self.image_name = f"gcr.io/{project_id}/{service_name}"
+        # デプロイするイメージ（ソースのフィンガープリントが取れた場合はそのタグ）
+        self.image_ref = self.image_name
+        self._image_up_to_date = False
+        self.service_url: Optional[str] = None
         self.project_root = Path(__file__).parent.parent
 
-    def run_command(
-        self, cmd: list[str], check: bool = True, cwd: Optional[Path] = None
+    async def run_command(
+        self,
+        cmd: list[str],
+        check: bool = True,
+        cwd: Optional[Path] = None,
+        stream: bool = False,
     ) -> subprocess.CompletedProcess:
-        """コマンド実行"""
+        """コマンド実行（イベントループをブロックしない）
+
+        stream=True の場合は出力をパイプで受け取らず端末へ直接流す
+        （戻り値の stdout / stderr は空文字列）。
+        """
         print(f"  実行: {' '.join(cmd)}")
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, cwd=cwd or self.project_root
+        pipe = None if stream else asyncio.subprocess.PIPE
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=pipe,
+            stderr=pipe,
+            cwd=cwd or self.project_root,
+        )
+        stdout, stderr = await proc.communicate()
+        result = subprocess.CompletedProcess(
+            cmd,
+            proc.returncode,
+            stdout.decode("utf-8", errors="replace") if stdout else "",
+            stderr.decode("utf-8", errors="replace") if stderr else "",
         )
         if check and result.returncode != 0:
             print(f"  エラー: {result.stderr}")
@@ -62,47 +132,55 @@ class CloudRunDeployer:
             )
         return result
 
-    def check_prerequisites(self) -> bool:
-        """前提条件確認"""
-        print("\n[1/6] 前提条件確認...")
-
-        # gcloud確認
-        result = self.run_command(["gcloud", "--version"], check=False)
-        if result.returncode != 0:
-            print("  ✗ gcloud CLI が見つかりません")
-            return False
-        print("  ✓ gcloud CLI")
+    async def _probe(self, cmd: list[str], semaphore: asyncio.Semaphore) -> bool:
+        """コマンドが正常終了するか確認（未インストールの場合は False）"""
+        async with semaphore:
+            try:
+                result = await self.run_command(cmd, check=False)
+            except FileNotFoundError:
+                return False
+            return result.returncode == 0
 
-        # Docker確認
-        result = self.run_command(["docker", "--version"], check=False)
-        if result.returncode != 0:
-            print("  ✗ Docker が見つかりません")
-            return False
-        print("  ✓ Docker")
+    async def _file_exists(self, path: Path) -> bool:
+        """ファイル存在確認"""
+        return path.exists()
 
-        # Dockerfile確認
-        dockerfile = self.project_root / "Dockerfile"
-        if not dockerfile.exists():
-            print("  ✗ Dockerfile が見つかりません")
-            return False
-        print("  ✓ Dockerfile")
+    async def check_prerequisites(self) -> bool:
+        """前提条件確認（各チェックは独立しているため並列実行）"""
+        print("\n[1/6] 前提条件確認...")
 
-        # 認証確認
-        result = self.run_command(
-            ["gcloud", "auth", "list", "--format=json"], check=False
-        )
-        if result.returncode != 0:
-            print("  ✗ gcloud 認証が必要です")
-            return False
-        print("  ✓ gcloud 認証")
+        semaphore = asyncio.Semaphore(4)
+        checks = [
+            ("gcloud CLI", "gcloud CLI が見つかりません",
+             self._probe(["gcloud", "--version"], semaphore)),
+            ("Dockerfile", "Dockerfile が見つかりません",
+             self._file_exists(self.project_root / "Dockerfile")),
+            ("gcloud 認証", "gcloud 認証が必要です",
+             self._probe(["gcloud", "auth", "list", "--format=json"], semaphore)),
+        ]
+        # Cloud Build ではローカルの Docker を使わない
+        if not self.use_cloud_build:
+            checks.insert(1, ("Docker", "Docker が見つかりません",
+                              self._probe(["docker", "--version"], semaphore)))
+        results = await asyncio.gather(*(coro for _, _, coro in checks))
+
+        # 結果は定義順に表示し、最初の失敗で終了
+        for (label, error, _), ok in zip(checks, results):
+            if not ok:
+                print(f"  ✗ {error}")
+                return False
+            print(f"  ✓ {label}")
 
         return True
 
-    def configure_docker(self) -> bool:
+    async def configure_docker(self) -> bool:
         """Docker認証設定"""
         print("\n[2/6] Docker 認証設定...")
+        if self.use_cloud_build:
+            print("  ✓ Cloud Build でビルドするためスキップ")
+            return True
 
-        result = self.run_command(
+        result = await self.run_command(
             ["gcloud", "auth", "configure-docker", "--quiet"], check=False
         )
 
@@ -113,39 +191,93 @@ class CloudRunDeployer:
         print("  ✓ Docker 認証設定完了")
         return True
 
-    def build_image(self) -> bool:
+    async def _source_fingerprint(self) -> Optional[str]:
+        """ソースツリーのフィンガープリント（git HEAD + 未コミット差分）
+
+        git 管理外、または未追跡ファイルがある場合は内容を特定できないため None。
+        """
+        try:
+            head = await self.run_command(["git", "rev-parse", "HEAD"], check=False)
+            status = await self.run_command(["git", "status", "--porcelain"], check=False)
+            diff = await self.run_command(["git", "diff", "HEAD"], check=False)
+        except FileNotFoundError:
+            return None
+        if head.returncode != 0 or status.returncode != 0 or diff.returncode != 0:
+            return None
+        if any(line.startswith("??") for line in status.stdout.splitlines()):
+            return None
+
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(head.stdout.encode())
+        digest.update(diff.stdout.encode())
+        return digest.hexdigest()
+
+    async def build_image(self) -> bool:
         """Dockerイメージビルド"""
         print("\n[3/6] Docker イメージビルド...")
-        print(f"  イメージ: {self.image_name}")
+        if self.use_cloud_build:
+            print("  ✓ Cloud Build でビルドするためスキップ")
+            return True
+
+        tag_args = ["-t", self.image_name]
+        fingerprint = await self._source_fingerprint()
+        if fingerprint:
+            self.image_ref = f"{self.image_name}:{fingerprint}"
+            # 同じソースのイメージがプッシュ済みならビルド・プッシュを省略
+            result = await self.run_command(
+                ["docker", "manifest", "inspect", self.image_ref], check=False
+            )
+            if result.returncode == 0:
+                self._image_up_to_date = True
+                print(f"  ✓ ソース未変更のためスキップ（{self.image_ref}）")
+                return True
+            tag_args += [
+                "-t",
+                self.image_ref,
+                f"--label=org.opencontainers.image.revision={fingerprint}",
+            ]
+        print(f"  イメージ: {self.image_ref}")
 
-        result = self.run_command(
+        # 前回イメージのレイヤーをキャッシュとして利用（初回は存在しないため失敗を無視）
+        cache_image = f"{self.image_name}:latest"
+        await self.run_command(["docker", "pull", cache_image], check=False, stream=True)
+
+        result = await self.run_command(
             [
                 "docker",
                 "build",
-                "-t",
-                self.image_name,
+                *tag_args,
+                f"--cache-from={cache_image}",
                 "-f",
                 "Dockerfile",
                 ".",
             ],
             check=False,
-            cwd=self.project_root,
+            stream=True,
         )
 
         if result.returncode != 0:
             print("  ✗ ビルド失敗")
-            print(result.stderr)
             return False
 
         print("  ✓ ビルド完了")
         return True
 
-    def push_image(self) -> bool:
+    async def push_image(self) -> bool:
         """イメージプッシュ"""
         print("\n[4/6] Docker イメージプッシュ...")
+        if self.use_cloud_build:
+            print("  ✓ Cloud Build でビルドするためスキップ")
+            return True
+        if self._image_up_to_date:
+            print("  ✓ プッシュ済みのためスキップ")
+            return True
         print(f"  プッシュ先: {self.image_name}")
 
-        result = self.run_command(["docker", "push", self.image_name], check=False)
+        # latest とフィンガープリントのタグをまとめてプッシュ
+        result = await self.run_command(
+            ["docker", "push", "--all-tags", self.image_name], check=False, stream=True
+        )
 
         if result.returncode != 0:
             print("  ✗ プッシュ失敗")
@@ -161,29 +293,16 @@ class CloudRunDeployer:
 
         if env_file.exists():
             print("  .env ファイルから環境変数を読み込み中...")
-            with open(env_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#") and "=" in line:
-                        key, _, value = line.partition("=")
-                        key = key.strip()
-                        value = value.strip().strip('"').strip("'")
-                        # 機密情報はSecret Managerで管理推奨
-                        if key not in [
-                            "GOOGLE_APPLICATION_CREDENTIALS",
-                            "STRIPE_SECRET_KEY",
-                            "STRIPE_WEBHOOK_SECRET",
-                        ]:
-                            env_vars[key] = value
+            env_vars.update(_read_env(env_file, env_file.stat().st_mtime_ns))
 
         # デフォルト環境変数
-        env_vars.setdefault("ENVIRONMENT", "production")
+        env_vars.setdefault("ENVIRONMENT", self.environment)
         env_vars.setdefault("GOOGLE_CLOUD_PROJECT", self.project_id)
         env_vars.setdefault("GOOGLE_CLOUD_REGION", self.region)
 
         return env_vars
 
-    def deploy_service(self) -> bool:
+    async def deploy_service(self) -> bool:
         """Cloud Run デプロイ"""
         print("\n[5/6] Cloud Run デプロイ...")
 
@@ -191,39 +310,62 @@ class CloudRunDeployer:
         env_vars = self.load_env_vars()
         env_str = ",".join(f"{k}={v}" for k, v in env_vars.items())
 
+        print(f"  最小インスタンス数: {self.min_instances} / 最大インスタンス数: {self.max_instances}")
+
+        # Cloud Build 利用時はソースのみ送信し、リージョン内でビルドする
+        source_arg = "--source=." if self.use_cloud_build else f"--image={self.image_ref}"
+
         cmd = [
             "gcloud",
             "run",
             "deploy",
             self.service_name,
-            f"--image={self.image_name}",
+            source_arg,
             f"--region={self.region}",
             f"--project={self.project_id}",
             f"--memory={self.memory}",
             f"--cpu={self.cpu}",
             f"--min-instances={self.min_instances}",
             f"--max-instances={self.max_instances}",
+            # 起動時のCPUブーストでコールドスタートを短縮し、
+            # 1インスタンスあたりの同時リクエスト数を明示してインスタンス数を抑える
+            "--cpu-boost",
+            "--execution-environment=gen2",
+            "--concurrency=80",
             "--platform=managed",
             "--allow-unauthenticated",
             "--port=8000",
             "--timeout=300",
             f"--set-env-vars={env_str}",
+            # 標準出力にはURLのみ出力させ、describe の再実行を不要にする
+            "--format=value(status.url)",
         ]
 
-        result = self.run_command(cmd, check=False)
+        result = await self.run_command(cmd, check=False)
 
         if result.returncode != 0:
             print("  ✗ デプロイ失敗")
             return False
 
+        url = result.stdout.strip()
+        if url.startswith("https://"):
+            self.service_url = url
+        elif match := _SERVICE_URL_RE.search(result.stderr):
+            self.service_url = match.group(1)
+
         print("  ✓ デプロイ完了")
         return True
 
-    def get_service_url(self) -> Optional[str]:
+    async def get_service_url(self) -> Optional[str]:
         """サービスURL取得"""
         print("\n[6/6] サービス情報取得...")
 
-        result = self.run_command(
+        # デプロイ時の出力から取得済みなら gcloud を再度起動しない
+        if self.service_url:
+            print(f"  ✓ サービスURL: {self.service_url}")
+            return self.service_url
+
+        result = await self.run_command(
             [
                 "gcloud",
                 "run",
@@ -242,12 +384,12 @@ class CloudRunDeployer:
             return None
 
         try:
-            service_info = json.loads(result.stdout)
+            service_info = _json_loads(result.stdout)
             url = service_info.get("status", {}).get("url")
             if url:
                 print(f"  ✓ サービスURL: {url}")
                 return url
-        except json.JSONDecodeError:
+        except _JSONDecodeError:
             pass
 
         return None
@@ -288,7 +430,7 @@ class CloudRunDeployer:
         print(f"   エンドポイント: {url}/api/v1/payment/webhook")
         print()
 
-    def deploy(self) -> bool:
+    async def deploy(self) -> bool:
         """デプロイ実行"""
         print("=" * 60)
         print("VisionCraftAI - Cloud Run デプロイ")
@@ -305,12 +447,13 @@ class CloudRunDeployer:
             self.deploy_service,
         ]
 
+        # ビルド → プッシュ → デプロイは依存関係があるため順次実行
         for step in steps:
-            if not step():
+            if not await step():
                 print("\n✗ デプロイ失敗")
                 return False
 
-        url = self.get_service_url()
+        url = await self.get_service_url()
         self.print_summary(url)
 
         return True
@@ -348,11 +491,17 @@ def main():
         default="2",
         help="CPU割り当て（デフォルト: 2）",
     )
+    parser.add_argument(
+        "--env",
+        choices=["production", "staging"],
+        default=None,
+        help="デプロイ環境（未指定時の ENVIRONMENT は production）",
+    )
     parser.add_argument(
         "--min-instances",
         type=int,
-        default=0,
-        help="最小インスタンス数（デフォルト: 0）",
+        default=None,
+        help="最小インスタンス数（デフォルト: --env production 指定時は 1、それ以外は 0）",
     )
     parser.add_argument(
         "--max-instances",
@@ -361,6 +510,12 @@ def main():
         help="最大インスタンス数（デフォルト: 10）",
     )
 
+    parser.add_argument(
+        "--use-cloud-build",
+        action="store_true",
+        help="ローカルでビルド・プッシュせず Cloud Build でソースからデプロイ",
+    )
+
     args = parser.parse_args()
 
     deployer = CloudRunDeployer(
@@ -371,9 +526,11 @@ def main():
         cpu=args.cpu,
         min_instances=args.min_instances,
         max_instances=args.max_instances,
+        use_cloud_build=args.use_cloud_build,
+        environment=args.env,
     )
 
-    success = deployer.deploy()
+    success = asyncio.run(deployer.deploy())
     sys.exit(0 if success else 1)
 
 
@@ -7,13 +7,25 @@ VisionCraftAI ロードテストスクリプト
 
 import argparse
 import asyncio
+import json
 import time
 from dataclasses import dataclass
 from datetime import datetime
-from statistics import mean, median, stdev
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
 
 import aiohttp
+import numpy as np
+
+try:
+    import orjson
+
+    _json_dumps = orjson.dumps
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+_EMPTY_HEADERS: Mapping[str, str] = MappingProxyType({})
 
 
 @dataclass
@@ -24,15 +36,7 @@ class LoadTestConfig:
     requests_per_user: int
     api_key: Optional[str] = None
     timeout: int = 30
-
-
-@dataclass
-class RequestResult:
-    """リクエスト結果"""
-    success: bool
-    status_code: int
-    latency_ms: float
-    error: Optional[str] = None
+    warmup_requests: int = 20
 
 
 @dataclass
@@ -57,124 +61,165 @@ class LoadTester:
 
     def __init__(self, config: LoadTestConfig):
         self.config = config
-        self.results: list[RequestResult] = []
+        # ヘッダーは全リクエストで共通のため一度だけ構築（aiohttp 側でコピーされる）
+        self._headers: Mapping[str, str] = (
+            MappingProxyType({"X-API-Key": config.api_key})
+            if config.api_key else _EMPTY_HEADERS
+        )
+        self._json_headers: Mapping[str, str] = MappingProxyType(
+            {**self._headers, "Content-Type": "application/json"}
+        )
+        # レイテンシーはリクエスト番号をインデックスとした配列に直接書き込む
+        # （整数マイクロ秒。タイムアウト上限でも int32 に収まる）。
+        # 成功・失敗は件数のみ必要なためカウンターで集計する
+        total = config.concurrent_users * config.requests_per_user
+        self.latencies_us = np.empty(total, dtype=np.int32)
+        self.success_count = 0
+        self.fail_count = 0
 
     async def _make_request(
         self,
         session: aiohttp.ClientSession,
-        endpoint: str,
+        url: str,
         method: str = "GET",
-        data: Optional[dict] = None
-    ) -> RequestResult:
-        """単一リクエストを実行"""
-        url = f"{self.config.base_url}{endpoint}"
-        headers = {}
-        if self.config.api_key:
-            headers["X-API-Key"] = self.config.api_key
-
-        start_time = time.time()
+        body: Optional[bytes] = None
+    ) -> tuple[int, int]:
+        """単一リクエストを実行し (ステータスコード, レイテンシーµs) を返す"""
+        # 単調増加クロックで計測（NTP補正による時刻の巻き戻りの影響を受けない）
+        start_ns = time.perf_counter_ns()
         try:
             async with session.request(
                 method,
                 url,
-                json=data,
-                headers=headers,
+                data=body,
+                headers=self._headers if body is None else self._json_headers,
                 timeout=aiohttp.ClientTimeout(total=self.config.timeout)
             ) as response:
-                latency_ms = (time.time() - start_time) * 1000
+                latency_us = (time.perf_counter_ns() - start_ns) // 1000
                 await response.read()
-                return RequestResult(
-                    success=response.status < 400,
-                    status_code=response.status,
-                    latency_ms=latency_ms
-                )
-        except asyncio.TimeoutError:
-            latency_ms = (time.time() - start_time) * 1000
-            return RequestResult(
-                success=False,
-                status_code=0,
-                latency_ms=latency_ms,
-                error="Timeout"
-            )
-        except Exception as e:
-            latency_ms = (time.time() - start_time) * 1000
-            return RequestResult(
-                success=False,
-                status_code=0,
-                latency_ms=latency_ms,
-                error=str(e)
-            )
+                return response.status, latency_us
+        except Exception:
+            # タイムアウト・接続エラーはステータス 0 として記録
+            return 0, (time.perf_counter_ns() - start_ns) // 1000
 
-    async def _user_session(
+    async def _worker(
         self,
-        user_id: int,
-        endpoint: str,
+        queue: asyncio.Queue,
+        session: aiohttp.ClientSession,
+        url: str,
         method: str = "GET",
-        data: Optional[dict] = None
-    ) -> list[RequestResult]:
-        """1ユーザーのセッションをシミュレート"""
-        results = []
-        async with aiohttp.ClientSession() as session:
-            for _ in range(self.config.requests_per_user):
-                result = await self._make_request(session, endpoint, method, data)
-                results.append(result)
-        return results
+        body: Optional[bytes] = None
+    ) -> None:
+        """キューが空になるまで次のリクエストを取得して実行"""
+        while (idx := await queue.get()) is not None:
+            status, self.latencies_us[idx] = await self._make_request(
+                session, url, method, body
+            )
+            # ステータス 0 はタイムアウト・接続エラー
+            if 0 < status < 400:
+                self.success_count += 1
+            else:
+                self.fail_count += 1
+
+    def create_session(self, scale: int = 1) -> aiohttp.ClientSession:
+        """コネクションプール付きセッションを作成
+
+        全ワーカーで1つのセッションを共有し、ハンドシェイクをユーザー数分
+        繰り返さないようにする。scale は同じセッションを共有するテスト数。
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self.config.concurrent_users * 2 * scale,
+            ttl_dns_cache=300,
+            keepalive_timeout=60
+        )
+        return aiohttp.ClientSession(connector=connector)
 
     async def run_test(
         self,
         endpoint: str,
         method: str = "GET",
-        data: Optional[dict] = None
+        data: Optional[dict] = None,
+        session: Optional[aiohttp.ClientSession] = None
     ) -> LoadTestReport:
-        """ロードテストを実行"""
+        """ロードテストを実行（session 未指定時は専用セッションを作成）"""
         print(f"\n{'=' * 60}")
         print(f"ロードテスト開始: {endpoint}")
         print(f"同時ユーザー数: {self.config.concurrent_users}")
         print(f"ユーザーあたりリクエスト数: {self.config.requests_per_user}")
         print(f"{'=' * 60}\n")
 
-        start_time = time.time()
-
-        # 全ユーザーのタスクを作成
-        tasks = [
-            self._user_session(i, endpoint, method, data)
-            for i in range(self.config.concurrent_users)
-        ]
-
-        # 並列実行
-        all_results = await asyncio.gather(*tasks)
+        # URL・リクエストボディはリクエストごとに変わらないため一度だけ構築
+        url = f"{self.config.base_url}{endpoint}"
+        body = _json_dumps(data) if data is not None else None
 
-        # 結果を平坦化
-        self.results = [r for user_results in all_results for r in user_results]
+        if session is None:
+            async with self.create_session() as session:
+                return await self._run(session, url, method, body)
+        return await self._run(session, url, method, body)
 
-        duration = time.time() - start_time
+    async def _run(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        method: str,
+        body: Optional[bytes]
+    ) -> LoadTestReport:
+        """ウォームアップ後にワーカーを起動して計測"""
+        concurrency = self.config.concurrent_users
+        total = len(self.latencies_us)
+        self.success_count = self.fail_count = 0
+
+        # 各ワーカーは完了次第次のリクエストを取得するため、
+        # 遅いユーザーに割り当てられた分で他のワーカーが遊ばない
+        queue: asyncio.Queue = asyncio.Queue()
+        for idx in range(total):
+            queue.put_nowait(idx)
+        for _ in range(concurrency):
+            queue.put_nowait(None)
+
+        # ウォームアップ（接続確立・DNS・インスタンス起動の影響を計測から除外）
+        if self.config.warmup_requests > 0:
+            await asyncio.gather(*(
+                self._make_request(session, url, method, body)
+                for _ in range(self.config.warmup_requests)
+            ))
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(
+            self._worker(queue, session, url, method, body)
+            for _ in range(concurrency)
+        ))
+        duration = time.perf_counter() - start_time
 
         return self._generate_report(duration)
 
     def _generate_report(self, duration: float) -> LoadTestReport:
         """テスト結果レポートを生成"""
-        successful = [r for r in self.results if r.success]
-        failed = [r for r in self.results if not r.success]
-        latencies = [r.latency_ms for r in self.results]
-
-        # パーセンタイル計算
-        sorted_latencies = sorted(latencies)
-        p95_idx = int(len(sorted_latencies) * 0.95)
-        p99_idx = int(len(sorted_latencies) * 0.99)
+        total = len(self.latencies_us)
+        successful = self.success_count
+        failed = self.fail_count
+
+        if total:
+            latencies = self.latencies_us / 1000
+            # パーセンタイル計算（線形補間）
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            avg, min_latency, max_latency = latencies.mean(), latencies.min(), latencies.max()
+        else:
+            p50 = p95 = p99 = avg = min_latency = max_latency = 0
 
         return LoadTestReport(
-            total_requests=len(self.results),
-            successful_requests=len(successful),
-            failed_requests=len(failed),
-            avg_latency_ms=mean(latencies) if latencies else 0,
-            median_latency_ms=median(latencies) if latencies else 0,
-            p95_latency_ms=sorted_latencies[p95_idx] if sorted_latencies else 0,
-            p99_latency_ms=sorted_latencies[p99_idx] if sorted_latencies else 0,
-            min_latency_ms=min(latencies) if latencies else 0,
-            max_latency_ms=max(latencies) if latencies else 0,
-            requests_per_second=len(self.results) / duration if duration > 0 else 0,
+            total_requests=total,
+            successful_requests=successful,
+            failed_requests=failed,
+            avg_latency_ms=float(avg),
+            median_latency_ms=float(p50),
+            p95_latency_ms=float(p95),
+            p99_latency_ms=float(p99),
+            min_latency_ms=float(min_latency),
+            max_latency_ms=float(max_latency),
+            requests_per_second=total / duration if duration > 0 else 0,
             duration_seconds=duration,
-            error_rate=len(failed) / len(self.results) * 100 if self.results else 0
+            error_rate=failed / total * 100 if total else 0
         )
 
 
@@ -201,8 +246,12 @@ def print_report(report: LoadTestReport, test_name: str):
     print(f"{'=' * 60}\n")
 
 
-async def run_all_tests(config: LoadTestConfig):
-    """全テストシナリオを実行"""
+async def run_all_tests(config: LoadTestConfig, parallel_scenarios: bool = False):
+    """全テストシナリオを実行
+
+    parallel_scenarios=True の場合は全シナリオを1つのセッションで同時に実行する
+    （シナリオ間の独立性と引き換えに、所要時間は最も遅いシナリオ程度になる）。
+    """
     tester = LoadTester(config)
     reports = []
 
@@ -258,14 +307,31 @@ async def run_all_tests(config: LoadTestConfig):
     print(f"ベースURL: {config.base_url}")
     print(f"{'#' * 60}\n")
 
-    for scenario in scenarios:
-        report = await tester.run_test(
-            endpoint=scenario["endpoint"],
-            method=scenario["method"],
-            data=scenario["data"]
-        )
-        print_report(report, scenario["name"])
-        reports.append((scenario["name"], report))
+    if parallel_scenarios:
+        # シナリオごとに結果バッファが必要なためテスターは個別に作成
+        testers = [LoadTester(config) for _ in scenarios]
+        async with tester.create_session(scale=len(scenarios)) as session:
+            results = await asyncio.gather(*(
+                t.run_test(
+                    endpoint=scenario["endpoint"],
+                    method=scenario["method"],
+                    data=scenario["data"],
+                    session=session
+                )
+                for t, scenario in zip(testers, scenarios)
+            ))
+        for scenario, report in zip(scenarios, results):
+            print_report(report, scenario["name"])
+            reports.append((scenario["name"], report))
+    else:
+        for scenario in scenarios:
+            report = await tester.run_test(
+                endpoint=scenario["endpoint"],
+                method=scenario["method"],
+                data=scenario["data"]
+            )
+            print_report(report, scenario["name"])
+            reports.append((scenario["name"], report))
 
     # サマリー
     print(f"\n{'#' * 60}")
@@ -324,6 +390,17 @@ def main():
         default=30,
         help="リクエストタイムアウト秒（デフォルト: 30）"
     )
+    parser.add_argument(
+        "--parallel-scenarios",
+        action="store_true",
+        help="全シナリオを同時に実行（所要時間短縮、シナリオ間の独立性は低下）"
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=20,
+        help="計測前のウォームアップリクエスト数（デフォルト: 20）"
+    )
 
     args = parser.parse_args()
 
@@ -332,10 +409,11 @@ def main():
         concurrent_users=args.users,
         requests_per_user=args.requests,
         api_key=args.api_key,
-        timeout=args.timeout
+        timeout=args.timeout,
+        warmup_requests=args.warmup
     )
 
-    asyncio.run(run_all_tests(config))
+    asyncio.run(run_all_tests(config, parallel_scenarios=args.parallel_scenarios))
 
 
 if __name__ == "__main__":
@@ -14,9 +14,14 @@ Manual actions required:
 3. Set up Stripe production API key
 """
 
+import functools
+import http.client
+import importlib.util
 import os
+import re
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Ensure UTF-8 output on Windows
@@ -25,6 +30,12 @@ if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
+# Matches the settings check_env_file looks for in a single pass over .env
+_ENV_CHECK_RE = re.compile(
+    rb"^[ \t]*(GOOGLE_APPLICATION_CREDENTIALS|STRIPE_API_KEY)[ \t]*=[ \t]*[\"']?(sk_live)?",
+    re.M,
+)
+
 
 def print_header(title: str) -> None:
     """Print header"""
@@ -39,19 +50,22 @@ def print_step(step: int, title: str) -> None:
     print("-" * 40)
 
 
+@functools.lru_cache(maxsize=1)
 def check_github_public() -> bool:
-    """Check if GitHub repository is public"""
-    import urllib.request
-    import urllib.error
-
-    url = "https://api.github.com/repos/masuda-hikari/VisionCraftAI"
+    """Check if GitHub repository is public (HEAD only, cached per process)"""
+    conn = http.client.HTTPSConnection("api.github.com", timeout=10)
     try:
-        with urllib.request.urlopen(url, timeout=10) as response:
-            return response.status == 200
-    except urllib.error.HTTPError:
-        return False
+        # GitHub API rejects requests without a User-Agent
+        conn.request(
+            "HEAD",
+            "/repos/masuda-hikari/VisionCraftAI",
+            headers={"User-Agent": "VisionCraftAI-quick-deploy"},
+        )
+        return conn.getresponse().status == 200
     except Exception:
         return False
+    finally:
+        conn.close()
 
 
 def check_gcloud_auth() -> bool:
@@ -76,12 +90,28 @@ def check_env_file() -> dict:
         "stripe_key": False,
     }
     if env_path.exists():
-        content = env_path.read_text()
-        result["google_credentials"] = "GOOGLE_APPLICATION_CREDENTIALS" in content
-        result["stripe_key"] = "STRIPE_API_KEY" in content and "sk_live" in content
+        for key, live in _ENV_CHECK_RE.findall(env_path.read_bytes()):
+            if key == b"GOOGLE_APPLICATION_CREDENTIALS":
+                result["google_credentials"] = True
+            elif live:
+                result["stripe_key"] = True
     return result
 
 
+def run_pytest() -> subprocess.CompletedProcess:
+    """Run the test suite (across all CPU cores when pytest-xdist is installed)"""
+    cmd = [sys.executable, "-m", "pytest", "tests/", "-q", "--tb=no", "-p", "no:cacheprovider"]
+    if importlib.util.find_spec("xdist") is not None:
+        cmd += ["-n", "auto", "--dist=loadfile"]
+    return subprocess.run(
+        cmd,
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).parent.parent,
+        timeout=120,
+    )
+
+
 def main():
     """Main process"""
     print_header("VisionCraftAI Quick Deploy")
@@ -91,9 +121,17 @@ def main():
     blockers = []
     ready_items = []
 
+    # The checks are independent, so run them concurrently and report in order.
+    # pytest dominates the wall time, so it is submitted first.
+    executor = ThreadPoolExecutor(max_workers=4)
+    pytest_future = executor.submit(run_pytest)
+    github_future = executor.submit(check_github_public)
+    gcloud_future = executor.submit(check_gcloud_auth)
+    env_future = executor.submit(check_env_file)
+
     # Step 1: Check GitHub repository
     print_step(1, "GitHub Repository Visibility Check")
-    if check_github_public():
+    if github_future.result():
         print("[OK] Repository is public")
         ready_items.append("GitHub Repository Public")
     else:
@@ -107,7 +145,7 @@ def main():
 
     # Step 2: Check gcloud authentication
     print_step(2, "Google Cloud Authentication Check")
-    if check_gcloud_auth():
+    if gcloud_future.result():
         print("[OK] gcloud is authenticated")
         ready_items.append("Google Cloud Auth")
     else:
@@ -119,7 +157,7 @@ def main():
 
     # Step 3: Check environment variables
     print_step(3, "Environment File Check")
-    env_status = check_env_file()
+    env_status = env_future.result()
     if env_status["exists"]:
         print("[OK] .env file exists")
     else:
@@ -140,13 +178,7 @@ def main():
     # Step 4: Check tests
     print_step(4, "Test Status Check")
     try:
-        result = subprocess.run(
-            [sys.executable, "-m", "pytest", "tests/", "-q", "--tb=no"],
-            capture_output=True,
-            text=True,
-            cwd=Path(__file__).parent.parent,
-            timeout=120,
-        )
+        result = pytest_future.result()
         if result.returncode == 0:
             print("[OK] All tests passed")
             for line in result.stdout.split("\n"):
@@ -160,6 +192,7 @@ def main():
         print("[WARN] Test execution timed out")
     except Exception as e:
         print(f"[WARN] Test execution error: {e}")
+    executor.shutdown()
 
     # Summary
     print_header("Deployment Readiness Summary")
@@ -20,27 +20,110 @@ Cloudflare Tunnelを使用してローカルデモサーバーを無料でイン
     - serveo.net: ssh -R 80:localhost:8000 serveo.net
 """
 
+import asyncio
+import hashlib
+import http.client
+import shutil
 import subprocess
 import sys
 import platform
+import socket
 import urllib.request
 import zipfile
 import os
 from pathlib import Path
 
+# プロジェクトルート（デモサーバーの作業ディレクトリ）
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# デモサーバーのポートと起動待ちの上限（秒）
+SERVER_PORT = 8000
+SERVER_START_TIMEOUT = 60
+
+# 実行中のOS（プロセス中は不変のため一度だけ取得）
+_SYSTEM = platform.system()
+
+# ダウンロード時の読み書きバッファ（8 MiB）
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# ダウンロードの最大試行回数（中断時は Range で続きから再開）
+DOWNLOAD_RETRIES = 3
+
+# 期待する cloudflared バイナリの SHA-256（Cloudflare のリリースノートに掲載）
+# ダウンロード先は latest のため固定値は持たず、環境変数で指定された場合のみ照合する
+CLOUDFLARED_SHA256 = os.environ.get("CLOUDFLARED_SHA256", "").strip().lower() or None
+
 
 def check_cloudflared_installed() -> bool:
-    """cloudflaredがインストールされているか確認"""
-    try:
-        result = subprocess.run(
-            ["cloudflared", "--version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        return result.returncode == 0
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return False
+    """cloudflaredがインストールされているか確認（PATH検索のみ、プロセス起動なし）"""
+    return shutil.which("cloudflared") is not None
+
+
+def _download_with_urllib(url: str, dest: Path) -> str:
+    """urllib でダウンロードし、SHA-256 を返す
+
+    接続が途中で切れた場合は Range ヘッダーで続きから再開する（最大 DOWNLOAD_RETRIES 回）。
+    """
+    # 書き込みと同時にハッシュを計算し、ファイルの再読み込みを避ける
+    # （再開時も書き込み済みのバイトはハッシュ済みのため、そのまま継続できる）
+    digest = hashlib.sha256()
+    received = 0
+
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        headers = {"Range": f"bytes={received}-"} if received else {}
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30) as response:
+                if received and response.status != 206:
+                    # サーバーが Range 非対応の場合は最初から取り直す
+                    digest = hashlib.sha256()
+                    received = 0
+                length = response.length
+                total = received + length if length is not None else None
+
+                # 大きなバッファでストリーミング書き込み（ファイル全体をメモリに載せない）
+                with open(dest, "ab" if received else "wb", buffering=DOWNLOAD_CHUNK_SIZE) as f:
+                    while chunk := response.read(DOWNLOAD_CHUNK_SIZE):
+                        digest.update(chunk)
+                        f.write(chunk)
+                        received += len(chunk)
+                        progress = f"{received / 2**20:.1f} MiB"
+                        if total:
+                            progress += f" / {total / 2**20:.1f} MiB"
+                        print(f"\r  {progress}", end="", flush=True)
+                print()
+
+            if total is not None and received < total:
+                raise http.client.IncompleteRead(b"", total - received)
+            return digest.hexdigest()
+        except (OSError, http.client.HTTPException) as e:
+            if attempt == DOWNLOAD_RETRIES:
+                raise
+            print(f"\n  ダウンロード中断（{e}）。{received} バイト目から再開します...")
+
+
+def download_file(url: str, dest: Path) -> str:
+    """ファイルをダウンロードし、SHA-256 を返す
+
+    ネイティブのダウンローダー（curl、Windows では PowerShell）があれば委譲し、
+    どちらも無い場合のみ urllib で取得する。
+    """
+    curl = shutil.which("curl")  # Windows 10 以降は System32 に curl.exe が同梱
+    powershell = shutil.which("powershell") if _SYSTEM == "Windows" else None
+
+    if curl:
+        subprocess.run([curl, "-fsSL", "--retry", "3", "-o", str(dest), url], check=True)
+    elif powershell:
+        # 進捗表示を無効にしないと Invoke-WebRequest は大幅に遅くなる
+        subprocess.run([
+            powershell, "-NoProfile", "-Command",
+            f"$ProgressPreference = 'SilentlyContinue'; Invoke-WebRequest -Uri '{url}' -OutFile '{dest}'",
+        ], check=True)
+    else:
+        return _download_with_urllib(url, dest)
+
+    # 外部ダウンローダー使用時は書き込み後にハッシュを計算する
+    with open(dest, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
 
 
 def install_cloudflared_windows():
@@ -55,33 +138,47 @@ def install_cloudflared_windows():
     cloudflared_path = bin_dir / "cloudflared.exe"
 
     try:
-        urllib.request.urlretrieve(url, cloudflared_path)
+        sha256 = download_file(url, cloudflared_path)
         print(f"✓ cloudflared をダウンロードしました: {cloudflared_path}")
+        print(f"  SHA-256: {sha256}")
+
+        if CLOUDFLARED_SHA256 and sha256 != CLOUDFLARED_SHA256:
+            cloudflared_path.unlink(missing_ok=True)
+            print("✗ SHA-256 が一致しません（ダウンロードしたファイルを削除しました）")
+            print(f"  期待値: {CLOUDFLARED_SHA256}")
+            return None
         return str(cloudflared_path)
     except Exception as e:
         print(f"✗ ダウンロードに失敗しました: {e}")
         return None
 
 
+# Windows以外は手動インストール手順を表示する
+_INSTALL_INSTRUCTIONS = {
+    "Darwin": (  # macOS
+        "macOSの場合は以下のコマンドでインストールしてください:\n"
+        "  brew install cloudflare/cloudflare/cloudflared"
+    ),
+    "Linux": (
+        "Linuxの場合は以下のコマンドでインストールしてください:\n"
+        "  wget -q https://github.com/cloudflare/cloudflared/releases/latest/download/cloudflared-linux-amd64\n"
+        "  chmod +x cloudflared-linux-amd64\n"
+        "  sudo mv cloudflared-linux-amd64 /usr/local/bin/cloudflared"
+    ),
+}
+
+_INSTALLERS = {
+    "Windows": install_cloudflared_windows,
+}
+
+
 def install_cloudflared():
     """cloudflaredをインストール"""
-    system = platform.system()
-
-    if system == "Windows":
-        return install_cloudflared_windows()
-    elif system == "Darwin":  # macOS
-        print("macOSの場合は以下のコマンドでインストールしてください:")
-        print("  brew install cloudflare/cloudflare/cloudflared")
-        return None
-    elif system == "Linux":
-        print("Linuxの場合は以下のコマンドでインストールしてください:")
-        print("  wget -q https://github.com/cloudflare/cloudflared/releases/latest/download/cloudflared-linux-amd64")
-        print("  chmod +x cloudflared-linux-amd64")
-        print("  sudo mv cloudflared-linux-amd64 /usr/local/bin/cloudflared")
-        return None
-    else:
-        print(f"未対応のOS: {system}")
-        return None
+    installer = _INSTALLERS.get(_SYSTEM)
+    if installer:
+        return installer()
+    print(_INSTALL_INSTRUCTIONS.get(_SYSTEM, f"未対応のOS: {_SYSTEM}"))
+    return None
 
 
 def show_alternative_methods():
@@ -111,6 +208,73 @@ def show_alternative_methods():
     print("="*60)
 
 
+def _port_open(port: int) -> bool:
+    """ローカルのポートが接続を受け付けているか確認"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+async def _wait_port(port: int, server=None, timeout: float = SERVER_START_TIMEOUT) -> bool:
+    """ポートが開くまで待機（サーバープロセスが終了した場合は即座に失敗）"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if _port_open(port):
+            return True
+        if server is not None and server.returncode is not None:
+            return False
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def run_server_and_tunnel(cloudflared_cmd: str) -> int:
+    """デモサーバーと cloudflared を並行して起動し、どちらかが終了するまで待機
+
+    トンネルの接続確立とサーバーの起動は互いに独立しているため同時に開始する。
+    両プロセスの出力はこのターミナルにそのまま表示される。
+    """
+    processes = []
+    try:
+        server = None
+        if _port_open(SERVER_PORT):
+            print(f"✓ ポート {SERVER_PORT} で起動中のサーバーを使用します")
+        else:
+            server = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "src.api.app", cwd=PROJECT_ROOT
+            )
+            processes.append(server)
+
+        tunnel = await asyncio.create_subprocess_exec(
+            cloudflared_cmd, "tunnel", "--url", f"http://localhost:{SERVER_PORT}"
+        )
+        processes.append(tunnel)
+
+        if not await _wait_port(SERVER_PORT, server):
+            print("\n✗ デモサーバーの起動に失敗しました")
+            return 1
+        print(f"\n✓ デモサーバー起動完了（http://localhost:{SERVER_PORT}）\n")
+
+        await asyncio.wait(
+            [asyncio.create_task(proc.wait()) for proc in processes],
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if tunnel.returncode:
+            print(f"\n✗ トンネルが異常終了しました（終了コード: {tunnel.returncode}）")
+            show_alternative_methods()
+            return 1
+        # トンネルより先にサーバーが終了した場合も失敗として扱う
+        if server is not None and server.returncode is not None:
+            print(f"\n✗ デモサーバーが終了しました（終了コード: {server.returncode}）")
+            return server.returncode or 1
+        return 0
+    finally:
+        # 残っているプロセスを終了する
+        for proc in processes:
+            if proc.returncode is None:
+                proc.terminate()
+                await proc.wait()
+
+
 def main():
     """メイン処理"""
     print("="*60)
@@ -134,27 +298,15 @@ def main():
 
     print("\n✓ cloudflared が利用可能です")
 
-    # デモサーバー起動確認
-    print("\n[Step 1] デモサーバー起動")
-    print("-" * 60)
-    print("別のターミナルで以下を実行してください:")
-    print("  python -m src.api.app")
-    print("")
-    input("デモサーバーを起動したら Enter を押してください...")
-
-    # Cloudflare Tunnel 起動
-    print("\n[Step 2] Cloudflare Tunnel 起動")
+    # デモサーバーとトンネルを同時に起動
+    print("\n[Step 1] デモサーバー・Cloudflare Tunnel 起動")
     print("-" * 60)
-    print("Cloudflare Tunnel を起動します...")
+    print("デモサーバー（python -m src.api.app）と Cloudflare Tunnel を起動します...")
     print("公開URLが表示されます（数秒お待ちください）\n")
 
     try:
-        # トンネル起動（http://localhost:8000 を公開）
-        subprocess.run(
-            [cloudflared_cmd, "tunnel", "--url", "http://localhost:8000"],
-            check=True
-        )
-    except subprocess.CalledProcessError as e:
+        return asyncio.run(run_server_and_tunnel(cloudflared_cmd))
+    except OSError as e:
         print(f"\n✗ トンネル起動に失敗しました: {e}")
         show_alternative_methods()
         return 1
@@ -162,8 +314,6 @@ def main():
         print("\n\nトンネルを終了しました")
         return 0
 
-    return 0
-
 
 if __name__ == "__main__":
     sys.exit(main())
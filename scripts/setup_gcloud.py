@@ -14,12 +14,26 @@ VisionCraftAI の Google Cloud 環境をセットアップするための自動
 """
 
 import argparse
+import asyncio
+import inspect
 import json
 import os
+import shutil
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
 
+# gcloud の JSON 出力は orjson があれば高速に解析する
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _JSONDecodeError: type[ValueError] = orjson.JSONDecodeError
+except ImportError:
+    _json_loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
+
 
 class GCloudSetup:
     """Google Cloud セットアップクラス"""
@@ -46,6 +60,11 @@ class GCloudSetup:
         self.service_account_email = f"{self.service_account_name}@{project_id}.iam.gserviceaccount.com"
         self.credentials_dir = Path(__file__).parent.parent / "credentials"
         self.credentials_file = self.credentials_dir / "service-account.json"
+        # 読み取り専用コマンド（auth list / projects describe / SA describe）の結果キャッシュ
+        self._prefetched = False
+        self._auth = None
+        self._project = None
+        self._sa = None
 
     def run_command(self, cmd: list[str], check: bool = True) -> subprocess.CompletedProcess:
         """コマンド実行"""
@@ -56,33 +75,83 @@ class GCloudSetup:
             raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
         return result
 
+    async def _run(self, cmd: list[str]) -> subprocess.CompletedProcess:
+        """コマンド実行（非同期版。独立したコマンドを並列に発行する際に使用）"""
+        print(f"  実行: {' '.join(cmd)}")
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate()
+        return subprocess.CompletedProcess(
+            cmd,
+            proc.returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+        )
+
+    def _auth_cmd(self) -> list[str]:
+        return ["gcloud", "auth", "list", "--format=json"]
+
+    def _project_cmd(self) -> list[str]:
+        return ["gcloud", "projects", "describe", self.project_id, "--format=json"]
+
+    def _sa_cmd(self) -> list[str]:
+        return [
+            "gcloud", "iam", "service-accounts", "describe", self.service_account_email,
+            f"--project={self.project_id}", "--format=json",
+        ]
+
+    @staticmethod
+    def _parse_json(result: subprocess.CompletedProcess):
+        """コマンド結果のJSONを解析（失敗時は None）"""
+        if result.returncode != 0:
+            return None
+        try:
+            return _json_loads(result.stdout)
+        except _JSONDecodeError:
+            return None
+
+    async def _prefetch(self) -> bool:
+        """読み取り専用の確認コマンドを並列実行し、結果をキャッシュ
+
+        以降の check_auth / set_project / create_service_account はキャッシュを参照し、
+        変更系のコマンドのみを発行する。
+        """
+        results = await asyncio.gather(
+            self._run(self._auth_cmd()),
+            self._run(self._project_cmd()),
+            self._run(self._sa_cmd()),
+        )
+        self._auth, self._project, self._sa = (self._parse_json(r) for r in results)
+        self._prefetched = True
+        return True
+
+    def _fetch(self, attr: str, cmd: list[str]):
+        """キャッシュ済みの結果を返す（未取得の場合のみコマンドを実行）"""
+        if self._prefetched:
+            return getattr(self, attr)
+        return self._parse_json(self.run_command(cmd, check=False))
+
     def check_gcloud_installed(self) -> bool:
         """gcloud CLI インストール確認"""
         print("\n[1/7] gcloud CLI 確認...")
-        try:
-            result = self.run_command(["gcloud", "--version"], check=False)
-            if result.returncode == 0:
-                print("  ✓ gcloud CLI インストール済み")
-                return True
-            else:
-                print("  ✗ gcloud CLI が見つかりません")
-                print("  インストール: https://cloud.google.com/sdk/docs/install")
-                return False
-        except FileNotFoundError:
+        # PATH検索のみで判定（gcloud --version の起動コストを避ける）
+        if shutil.which("gcloud") is None:
             print("  ✗ gcloud CLI が見つかりません")
             print("  インストール: https://cloud.google.com/sdk/docs/install")
             return False
+        print("  ✓ gcloud CLI インストール済み")
+        return True
 
     def check_auth(self) -> bool:
         """認証状態確認"""
         print("\n[2/7] 認証状態確認...")
-        result = self.run_command(["gcloud", "auth", "list", "--format=json"], check=False)
-        if result.returncode != 0:
+        accounts = self._fetch("_auth", self._auth_cmd())
+        if accounts is None:
             print("  ✗ 認証されていません")
             print("  実行: gcloud auth login")
             return False
 
-        accounts = json.loads(result.stdout)
         active = [a for a in accounts if a.get("status") == "ACTIVE"]
         if not active:
             print("  ✗ アクティブなアカウントがありません")
@@ -97,11 +166,7 @@ class GCloudSetup:
         print(f"\n[3/7] プロジェクト設定: {self.project_id}...")
 
         # プロジェクト存在確認
-        result = self.run_command(
-            ["gcloud", "projects", "describe", self.project_id, "--format=json"],
-            check=False
-        )
-        if result.returncode != 0:
+        if self._fetch("_project", self._project_cmd()) is None:
             print(f"  ✗ プロジェクト '{self.project_id}' が見つかりません")
             return False
 
@@ -110,19 +175,20 @@ class GCloudSetup:
         print(f"  ✓ プロジェクト設定完了")
         return True
 
-    def enable_apis(self) -> bool:
+    async def enable_apis(self) -> bool:
         """必要なAPI有効化"""
         print("\n[4/7] API 有効化...")
 
+        # 複数APIを1回の呼び出しでまとめて有効化（サーバー側で一括処理される）
         for api in self.REQUIRED_APIS:
             print(f"  有効化中: {api}")
-            result = self.run_command(
-                ["gcloud", "services", "enable", api, f"--project={self.project_id}"],
-                check=False
-            )
-            if result.returncode != 0:
-                print(f"  ✗ {api} の有効化に失敗")
-                return False
+        result = await self._run(
+            ["gcloud", "services", "enable", *self.REQUIRED_APIS, f"--project={self.project_id}"]
+        )
+        if result.returncode != 0:
+            print("  ✗ API の有効化に失敗")
+            return False
+        for api in self.REQUIRED_APIS:
             print(f"    ✓ {api}")
 
         print("  ✓ 全API有効化完了")
@@ -132,13 +198,12 @@ class GCloudSetup:
         """サービスアカウント作成"""
         print(f"\n[5/7] サービスアカウント作成: {self.service_account_name}...")
 
-        # 既存確認
-        result = self.run_command(
-            ["gcloud", "iam", "service-accounts", "describe", self.service_account_email, f"--project={self.project_id}"],
-            check=False
-        )
-
-        if result.returncode == 0:
+        # 既存確認（先読みは API 有効化前に行うため、「見つからない」結果は
+        # IAM API 無効などによる失敗の可能性がある。作成前に改めて確認する）
+        sa = self._fetch("_sa", self._sa_cmd())
+        if sa is None and self._prefetched:
+            sa = self._parse_json(self.run_command(self._sa_cmd(), check=False))
+        if sa is not None:
             print("  ✓ サービスアカウント既存")
         else:
             # 作成
@@ -156,22 +221,56 @@ class GCloudSetup:
 
         return True
 
-    def grant_roles(self) -> bool:
+    async def grant_roles(self) -> bool:
         """ロール付与"""
         print("\n[6/7] ロール付与...")
 
-        for role in self.SERVICE_ACCOUNT_ROLES:
-            print(f"  付与中: {role}")
-            result = self.run_command([
-                "gcloud", "projects", "add-iam-policy-binding", self.project_id,
-                f"--member=serviceAccount:{self.service_account_email}",
-                f"--role={role}",
-                "--condition=None"
-            ], check=False)
+        # ポリシーを1回取得し、全ロールを追加してから1回で書き戻す
+        # （ロールごとの add-iam-policy-binding は取得・更新を毎回繰り返すため）
+        result = await self._run(
+            ["gcloud", "projects", "get-iam-policy", self.project_id, "--format=json"]
+        )
+        policy = self._parse_json(result)
+        if policy is None:
+            print("  ✗ IAMポリシーの取得に失敗")
+            return False
+
+        member = f"serviceAccount:{self.service_account_email}"
+        bindings = policy.setdefault("bindings", [])
+        # 条件なしのバインディングのみ統合対象（条件付きは別物として扱う）
+        by_role = {b["role"]: b for b in bindings if "condition" not in b}
 
-            if result.returncode != 0 and "already exists" not in result.stderr:
-                print(f"  警告: {role} の付与でエラー（既に存在する可能性）")
+        added = []
+        for role in self.SERVICE_ACCOUNT_ROLES:
+            print(f"  付与: {role}")
+            binding = by_role.get(role)
+            if binding is None:
+                binding = {"role": role, "members": []}
+                bindings.append(binding)
+                by_role[role] = binding
+            if member in binding["members"]:
+                print(f"    ✓ {role}（付与済み）")
             else:
+                binding["members"].append(member)
+                added.append(role)
+
+        if added:
+            # etag を含めて書き戻すため、取得後に他で更新されていれば失敗する
+            with tempfile.NamedTemporaryFile(
+                "w", suffix=".json", encoding="utf-8", delete=False
+            ) as f:
+                json.dump(policy, f)
+            try:
+                result = await self._run([
+                    "gcloud", "projects", "set-iam-policy", self.project_id, f.name,
+                    "--format=json",
+                ])
+            finally:
+                os.unlink(f.name)
+            if result.returncode != 0:
+                print("  ✗ IAMポリシーの更新に失敗")
+                return False
+            for role in added:
                 print(f"    ✓ {role}")
 
         print("  ✓ ロール付与完了")
@@ -242,6 +341,7 @@ class GCloudSetup:
 
         steps = [
             self.check_gcloud_installed,
+            self._prefetch,
             self.check_auth,
             self.set_project,
             self.enable_apis,
@@ -251,7 +351,11 @@ class GCloudSetup:
         ]
 
         for step in steps:
-            if not step():
+            # 並列実行するステップ（コルーチン）はイベントループ上で実行
+            result = step()
+            if inspect.iscoroutine(result):
+                result = asyncio.run(result)
+            if not result:
                 print("\n✗ セットアップ失敗")
                 return False
 
@@ -17,6 +17,7 @@ import argparse
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Optional
 
@@ -100,6 +101,8 @@ class StripeSetup:
 
     def __init__(self, api_key: str, webhook_url: Optional[str] = None):
         self.api_key = api_key
+        # 本番モード判定（キーは不変のため一度だけ判定）
+        self.is_live = bool(api_key) and api_key.startswith("sk_live_")
         self.webhook_url = webhook_url
         self.created_ids: dict[str, str] = {}
         self.project_root = Path(__file__).parent.parent
@@ -110,103 +113,156 @@ class StripeSetup:
             return False
 
         stripe.api_key = self.api_key
+        stripe.default_http_client = self._make_http_client()
 
-        # APIキー検証
+        # APIキー検証（最初の接続でTLSセッションを確立し、以降の呼び出しで再利用）
         print("\n[1/5] APIキー検証...")
         try:
             stripe.Account.retrieve()
-            is_live = self.api_key.startswith("sk_live_")
-            mode = "本番" if is_live else "テスト"
+            mode = "本番" if self.is_live else "テスト"
             print(f"  ✓ APIキー有効（{mode}モード）")
             return True
         except stripe.error.AuthenticationError:
             print("  ✗ APIキーが無効です")
             return False
 
+    # 作成APIの同時実行数
+    MAX_CREATE_WORKERS = 8
+
+    # Stripe APIのタイムアウト（秒）
+    HTTP_TIMEOUT = 30
+
+    def _make_http_client(self):
+        """接続プールを持つ Stripe HTTP クライアントを生成
+
+        全API呼び出しで1つの requests.Session を共有し、Keep-Alive により
+        TLSハンドシェイクを最初の1回に抑える。並列作成に合わせてプールサイズを確保する。
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.MAX_CREATE_WORKERS,
+            pool_maxsize=self.MAX_CREATE_WORKERS,
+        )
+        session.mount("https://", adapter)
+        return stripe.RequestsClient(session=session, timeout=self.HTTP_TIMEOUT)
+
+    def _create_all(self, create, requests: list[tuple[str, str, dict[str, Any]]]) -> None:
+        """未作成の商品・価格を並列に作成して ID を記録
+
+        requests は (created_ids のキー, ログ表示, create の引数) のリスト。
+        各作成は独立したリクエストのため並列に発行する。
+        """
+        if not requests:
+            return
+        with ThreadPoolExecutor(max_workers=self.MAX_CREATE_WORKERS) as executor:
+            futures = [executor.submit(create, **kwargs) for _, _, kwargs in requests]
+            for (key, label, _), future in zip(requests, futures):
+                obj = future.result()
+                print(f"  ✓ {label} ({obj.id})")
+                self.created_ids[key] = obj.id
+
+    def _find_existing(self, resource, vca_ids, **filters) -> dict[str, Any]:
+        """vca_id をキーに既存オブジェクトを取得
+
+        filters（list の絞り込み条件）がある場合は対象が絞られているため list で取得する。
+        filters がない場合は Search API でメタデータをサーバー側で絞り込む。
+        ただし Search の索引は最大1分程度遅れて反映されるため、直前の実行で作成した
+        オブジェクトが見つからないことがある。要求した vca_id が揃わない場合や
+        Search API が使えないアカウントでは、重複作成を防ぐため list で全件確認する。
+        """
+        vca_ids = list(vca_ids)
+        if not filters:
+            try:
+                # Search API は AND と OR を混在できないため、OR で vca_id のみ指定する
+                query = " OR ".join(f'metadata["vca_id"]:"{vca_id}"' for vca_id in vca_ids)
+                found = {
+                    obj.metadata.get("vca_id"): obj
+                    for obj in resource.search(query=query, limit=100).auto_paging_iter()
+                }
+                if all(vca_id in found for vca_id in vca_ids):
+                    return found
+            except stripe.error.InvalidRequestError:
+                pass
+        found = resource.list(limit=100, **filters).auto_paging_iter()
+        return {obj.metadata.get("vca_id"): obj for obj in found}
+
     def create_products(self) -> bool:
         """商品作成"""
         print("\n[2/5] 商品作成...")
 
-        for product_id, product_data in self.PRODUCTS.items():
-            # 既存確認
-            existing = list(stripe.Product.list(limit=100).data)
-            found = next(
-                (p for p in existing if p.metadata.get("vca_id") == product_id), None
-            )
+        # 本番モードで平文HTTPのWebhookを登録しないよう、作成を始める前に止める
+        if self.is_live and self.webhook_url and self.webhook_url.startswith("http://"):
+            print("  ✗ 本番モードでは https:// の Webhook URL を指定してください")
+            return False
+
+        # 既存商品は一度だけ取得し、vca_id で引けるようにする
+        existing = self._find_existing(stripe.Product, self.PRODUCTS)
 
+        to_create = []
+        for product_id, product_data in self.PRODUCTS.items():
+            found = existing.get(product_id)
             if found:
                 print(f"  ✓ 商品既存: {product_data['name']} ({found.id})")
                 self.created_ids[f"product_{product_id}"] = found.id
             else:
-                product = stripe.Product.create(
-                    name=product_data["name"],
-                    description=product_data["description"],
-                    metadata={"vca_id": product_id},
-                )
-                print(f"  ✓ 商品作成: {product_data['name']} ({product.id})")
-                self.created_ids[f"product_{product_id}"] = product.id
-
+                to_create.append((
+                    f"product_{product_id}",
+                    f"商品作成: {product_data['name']}",
+                    {
+                        "name": product_data["name"],
+                        "description": product_data["description"],
+                        "metadata": {"vca_id": product_id},
+                    },
+                ))
+
+        self._create_all(stripe.Product.create, to_create)
         return True
 
+    def _collect_prices(
+        self, product_id: str, prices: dict[str, dict[str, Any]]
+    ) -> list[tuple[str, str, dict[str, Any]]]:
+        """商品の既存価格を確認し、未作成の価格の作成引数を返す"""
+        # 商品ごとに一度だけ取得し、vca_id で引けるようにする
+        existing = self._find_existing(stripe.Price, prices, product=product_id, active=True)
+
+        to_create = []
+        for price_id, price_data in prices.items():
+            found = existing.get(price_id)
+            if found:
+                print(f"  ✓ 価格既存: {price_data['nickname']} ({found.id})")
+                self.created_ids[f"price_{price_id}"] = found.id
+            else:
+                to_create.append((
+                    f"price_{price_id}",
+                    f"価格作成: {price_data['nickname']}",
+                    {
+                        "product": product_id,
+                        **price_data,
+                        "metadata": {"vca_id": price_id},
+                    },
+                ))
+        return to_create
+
     def create_prices(self) -> bool:
         """価格作成"""
         print("\n[3/5] 価格作成...")
 
+        to_create = []
+
         # サブスクリプション価格
         subscription_product_id = self.created_ids.get("product_subscription")
         if subscription_product_id:
-            for price_id, price_data in self.SUBSCRIPTION_PRICES.items():
-                existing = list(
-                    stripe.Price.list(
-                        product=subscription_product_id, active=True, limit=100
-                    ).data
-                )
-                found = next(
-                    (p for p in existing if p.metadata.get("vca_id") == price_id), None
-                )
-
-                if found:
-                    print(f"  ✓ 価格既存: {price_data['nickname']} ({found.id})")
-                    self.created_ids[f"price_{price_id}"] = found.id
-                else:
-                    price = stripe.Price.create(
-                        product=subscription_product_id,
-                        unit_amount=price_data["unit_amount"],
-                        currency=price_data["currency"],
-                        nickname=price_data["nickname"],
-                        recurring=price_data["recurring"],
-                        metadata={"vca_id": price_id},
-                    )
-                    print(f"  ✓ 価格作成: {price_data['nickname']} ({price.id})")
-                    self.created_ids[f"price_{price_id}"] = price.id
+            to_create += self._collect_prices(subscription_product_id, self.SUBSCRIPTION_PRICES)
 
         # クレジット価格
         credits_product_id = self.created_ids.get("product_credits")
         if credits_product_id:
-            for price_id, price_data in self.CREDIT_PRICES.items():
-                existing = list(
-                    stripe.Price.list(
-                        product=credits_product_id, active=True, limit=100
-                    ).data
-                )
-                found = next(
-                    (p for p in existing if p.metadata.get("vca_id") == price_id), None
-                )
-
-                if found:
-                    print(f"  ✓ 価格既存: {price_data['nickname']} ({found.id})")
-                    self.created_ids[f"price_{price_id}"] = found.id
-                else:
-                    price = stripe.Price.create(
-                        product=credits_product_id,
-                        unit_amount=price_data["unit_amount"],
-                        currency=price_data["currency"],
-                        nickname=price_data["nickname"],
-                        metadata={"vca_id": price_id},
-                    )
-                    print(f"  ✓ 価格作成: {price_data['nickname']} ({price.id})")
-                    self.created_ids[f"price_{price_id}"] = price.id
+            to_create += self._collect_prices(credits_product_id, self.CREDIT_PRICES)
 
+        self._create_all(stripe.Price.create, to_create)
         return True
 
     def create_webhook(self) -> Optional[str]:
@@ -219,9 +275,14 @@ class StripeSetup:
 
         webhook_endpoint = f"{self.webhook_url}/api/v1/payment/webhook"
 
-        # 既存確認
-        existing = list(stripe.WebhookEndpoint.list(limit=100).data)
-        found = next((w for w in existing if w.url == webhook_endpoint), None)
+        # 既存確認（ページを順に取得し、見つかった時点で打ち切る）
+        found = next(
+            (
+                w for w in stripe.WebhookEndpoint.list(limit=100).auto_paging_iter()
+                if w.url == webhook_endpoint
+            ),
+            None,
+        )
 
         if found:
             print(f"  ✓ Webhook既存: {found.id}")
@@ -252,23 +313,19 @@ class StripeSetup:
         """設定保存"""
         print("\n[5/5] 設定保存...")
 
-        config = {
-            "products": {
-                k.replace("product_", ""): v
-                for k, v in self.created_ids.items()
-                if k.startswith("product_")
-            },
-            "prices": {
-                k.replace("price_", ""): v
-                for k, v in self.created_ids.items()
-                if k.startswith("price_")
-            },
-        }
-
-        # 設定ファイル保存
+        # created_ids のキー（product_xxx / price_xxx）を1回の走査で振り分ける
+        config: dict[str, dict[str, str]] = {"products": {}, "prices": {}}
+        for key, stripe_id in self.created_ids.items():
+            kind, _, name = key.partition("_")
+            bucket = config.get(f"{kind}s")
+            if bucket is not None:
+                bucket[name] = stripe_id
+
+        # 設定ファイル保存（文字列を組み立てずにファイルへ直接書き出す）
         config_file = self.project_root / "config" / "stripe_ids.json"
         config_file.parent.mkdir(parents=True, exist_ok=True)
-        config_file.write_text(json.dumps(config, indent=2), encoding="utf-8")
+        with config_file.open("w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2)
         print(f"  ✓ 設定保存: {config_file}")
 
         # .env追加内容を表示
@@ -4,23 +4,25 @@ VisionCraftAI - API モジュール
 
 FastAPIベースのRESTful APIを提供します。
 収益化の中核となるモジュールです。
+
+スキーマは初回アクセス時に読み込みます（PEP 562）。
+サブモジュールのみを使うツールが FastAPI アプリ全体を読み込まずに済むようにするためです。
+FastAPI アプリ本体は `from src.api.app import app` で取得してください。
 """
 
-from src.api.schemas import (
-    GenerateRequest,
-    GenerateResponse,
-    BatchRequest,
-    BatchResponse,
-    UsageResponse,
-    HealthResponse,
-    ErrorResponse,
-    EstimateRequest,
-    EstimateResponse,
-)
-from src.api.app import app
+_SCHEMA_NAMES = frozenset({
+    "GenerateRequest",
+    "GenerateResponse",
+    "BatchRequest",
+    "BatchResponse",
+    "UsageResponse",
+    "HealthResponse",
+    "ErrorResponse",
+    "EstimateRequest",
+    "EstimateResponse",
+})
 
 __all__ = [
-    "app",
     "GenerateRequest",
     "GenerateResponse",
     "BatchRequest",
@@ -31,3 +33,15 @@ __all__ = [
     "EstimateRequest",
     "EstimateResponse",
 ]
+
+
+def __getattr__(name: str):
+    if name in _SCHEMA_NAMES:
+        from src.api import schemas
+
+        return getattr(schemas, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+VisionCraftAI - JSON シリアライズ共通処理
+
+orjson がインストールされていれば高速にシリアライズ・解析し、
+未インストールの場合は標準の json を使います。
+"""
+
+import json
+
+try:
+    import orjson
+
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:
+    def dumps(obj) -> bytes:
+        """オブジェクトを UTF-8 の JSON バイト列に変換"""
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    loads = json.loads
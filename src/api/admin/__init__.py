@@ -1,9 +1,24 @@
 # -*- coding: utf-8 -*-
 """
 VisionCraftAI - 管理者モジュール
-"""
 
-from .routes import router as admin_router
-from .dashboard import AdminDashboard
+各シンボルは初回アクセス時に読み込みます（PEP 562）。
+"""
 
 __all__ = ["admin_router", "AdminDashboard"]
+
+
+def __getattr__(name: str):
+    if name == "admin_router":
+        from .routes import router
+
+        return router
+    if name == "AdminDashboard":
+        from .dashboard import AdminDashboard
+
+        return AdminDashboard
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
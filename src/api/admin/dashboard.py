@@ -5,12 +5,27 @@ VisionCraftAI - 管理者ダッシュボード
 収益・ユーザー・使用量のメトリクスを集計・提供します。
 """
 
-import json
+import functools
+import heapq
+import inspect
 import logging
-from datetime import datetime, timedelta
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, UTC
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional
+from threading import Lock
+from typing import Any, Callable, Iterator, Optional
 
+try:
+    import ijson
+except ImportError:  # 未インストール時は json で一括読み込み
+    ijson = None
+
+from .._json import loads as _json_loads
 from .schemas import (
     RevenueMetrics,
     UserMetrics,
@@ -25,6 +40,94 @@ from .schemas import (
 
 logger = logging.getLogger(__name__)
 
+# レコードの型判定（filter に渡し、判定ループを C 側で回す）
+_is_dict = dict.__instancecheck__
+
+# ISO 8601 タイムスタンプ先頭の日付部分（YYYY-MM-DD）
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+@functools.lru_cache(maxsize=4096)
+def _valid_day(day: str) -> Optional[str]:
+    """実在する日付（YYYY-MM-DD）なら day を、そうでなければ None を返す
+
+    日付の種類ごとに1回だけ検証する。
+    """
+    if not _ISO_DATE_RE.fullmatch(day):
+        return None
+    try:
+        date.fromisoformat(day)
+    except ValueError:
+        return None
+    return day
+
+
+def _date_key(timestamp: Any) -> Optional[str]:
+    """タイムスタンプの日付部分（YYYY-MM-DD）を返す（不正な値は None）
+
+    日付単位の比較は文字列のまま行い、datetime の生成を省略する。
+    日付の後ろには時刻の区切り（"T" または空白）のみを許可する。
+    """
+    if not isinstance(timestamp, str) or (len(timestamp) > 10 and timestamp[10] not in "T "):
+        return None
+    return _valid_day(timestamp[:10])
+
+
+def _cached_metric(*file_attrs: str) -> Callable:
+    """メトリクス計算結果をTTL付きでキャッシュするデコレーター
+
+    キャッシュキーは (メソッド名, 既定値を補完した引数)。位置引数・キーワード引数・
+    省略のいずれで呼んでも同じ値なら同じエントリを使う。参照するデータファイルの
+    更新時刻・サイズが変わった場合、または TTL 経過後に再計算する。
+    保持件数は CACHE_MAX_ENTRIES までとし、最も長く使われていないものから破棄する。
+
+    Args:
+        file_attrs: メトリクスが参照するデータファイルの属性名
+    """
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self: "AdminDashboard", *args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = (method.__name__, tuple(bound.arguments.items())[1:])
+            stamps = tuple(self._file_stamp(getattr(self, attr)) for attr in file_attrs)
+            now = time.monotonic()
+
+            cache = self._metric_cache
+            with self._metric_cache_lock:
+                entry = cache.get(key)
+                if entry is not None and entry[0] > now and entry[1] == stamps:
+                    cache.move_to_end(key)
+                    return entry[2]
+
+            value = method(self, *args, **kwargs)
+            with self._metric_cache_lock:
+                cache[key] = (now + self.CACHE_TTL_SECONDS, stamps, value)
+                cache.move_to_end(key)
+                while len(cache) > self.CACHE_MAX_ENTRIES:
+                    cache.popitem(last=False)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+@dataclass
+class _AllMetrics:
+    """一括計算したメトリクス（AdminDashboard._compute_all の結果）"""
+
+    revenue: RevenueMetrics
+    users: UserMetrics
+    usage: UsageMetrics
+    plan_distribution: PlanDistribution
+    revenue_chart: list[RevenueChartData]
+    usage_chart: list[UsageChartData]
+    health: SystemHealth
+    computed_at: datetime
+
 
 class AdminDashboard:
     """管理者ダッシュボードクラス"""
@@ -37,6 +140,11 @@ class AdminDashboard:
         "enterprise": 99.99,
     }
 
+    # メトリクスキャッシュの有効期間（秒）
+    CACHE_TTL_SECONDS = 30.0
+    # メトリクスキャッシュの最大件数（ページ・日数など引数の組み合わせごとに1件）
+    CACHE_MAX_ENTRIES = 128
+
     def __init__(self, data_dir: Optional[Path] = None):
         """
         管理者ダッシュボード初期化
@@ -54,87 +162,171 @@ class AdminDashboard:
         self.credits_file = self.data_dir / "credits.json"
         self.contacts_file = self.data_dir / "contacts.json"
 
+        # メトリクスキャッシュ: キー -> (有効期限, ファイル状態, 計算結果)
+        self._metric_cache: OrderedDict[tuple, tuple[float, tuple, Any]] = OrderedDict()
+        self._metric_cache_lock = Lock()
+
+    @staticmethod
+    def _file_stamp(file_path: Path) -> Optional[tuple[int, int]]:
+        """ファイルの更新時刻とサイズを取得（存在しない場合は None）"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
     def _load_json(self, file_path: Path) -> dict | list:
         """JSONファイルを読み込む"""
         if not file_path.exists():
             return {} if file_path.name in ["api_keys.json", "subscriptions.json", "credits.json"] else []
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return _json_loads(file_path.read_bytes())
         except Exception as e:
             logger.warning(f"JSONファイル読み込みエラー: {file_path}: {e}")
             return {} if file_path.name in ["api_keys.json", "subscriptions.json", "credits.json"] else []
 
-    def get_revenue_metrics(self) -> RevenueMetrics:
-        """収益メトリクスを取得"""
+    def _iter_usage_records(self) -> Iterator[dict]:
+        """使用量レコード（辞書のみ）を1件ずつ返す
+
+        ijson がインストールされていればファイルを逐次解析し、全件をメモリに
+        展開しない。未インストールの場合は一括で読み込む。
+        """
+        if ijson is None:
+            records = self._load_json(self.usage_file)
+            if isinstance(records, list):
+                yield from filter(_is_dict, records)
+            return
+
+        if not self.usage_file.exists():
+            return
+        try:
+            with open(self.usage_file, "rb") as f:
+                yield from filter(_is_dict, ijson.items(f, "item", use_float=True))
+        except Exception as e:
+            logger.warning(f"JSONファイル読み込みエラー: {self.usage_file}: {e}")
+
+    @staticmethod
+    def _iter_dicts(data: dict | list) -> Iterator[dict]:
+        """辞書なら値、リストなら要素のうち、辞書であるものだけを返す"""
+        return filter(_is_dict, data.values() if isinstance(data, dict) else data)
+
+    @staticmethod
+    def _chart_dates(end_date: date, days: int) -> list[str]:
+        """チャート用の過去N日分の日付文字列（昇順）"""
+        start_date = end_date - timedelta(days=days - 1)
+        return [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
+
+    @staticmethod
+    def _fold_day_revenue(
+        day_revenue: dict[str, float],
+        revenue_chart: dict[str, dict[str, float]],
+        field: str,
+        month_start_iso: str,
+        today_iso: str,
+    ) -> tuple[float, float, float]:
+        """日別売上を収益チャートに加算し、(合計, 今月, 今日) の売上を返す
+
+        day_revenue のキーは _date_key で検証済みの日付とし、不正な日付の売上
+        （キーが空文字）は合計・チャートのいずれにも含めない。
+        """
+        total = 0.0
+        monthly = 0.0
+        daily = 0.0
+        for day, revenue in day_revenue.items():
+            if not day:
+                continue
+            total += revenue
+            if day >= month_start_iso:
+                monthly += revenue
+            if day == today_iso:
+                daily += revenue
+            bucket = revenue_chart.get(day)
+            if bucket is not None:
+                bucket[field] += revenue
+                bucket["revenue"] += revenue
+        return total, monthly, daily
+
+    @_cached_metric("api_keys_file", "usage_file", "subscriptions_file", "credits_file")
+    def _compute_all(self, days: int = 30) -> _AllMetrics:
+        """全メトリクスを一括計算
+
+        各データファイルを1回だけ読み込み、1回の走査で収益・ユーザー・使用量・
+        プラン分布・チャート・ヘルス情報の集計値をまとめて更新する。
+        """
+        api_keys = self._load_json(self.api_keys_file)
         subscriptions = self._load_json(self.subscriptions_file)
         credits_data = self._load_json(self.credits_file)
-        api_keys = self._load_json(self.api_keys_file)
 
         now = datetime.now()
         today = now.date()
         month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        thirty_days_ago = now - timedelta(days=30)
+        twenty_four_hours_ago = now - timedelta(hours=24)
 
-        # サブスクリプション収益計算
-        subscription_revenue = 0.0
-        monthly_subscription_revenue = 0.0
-        daily_subscription_revenue = 0.0
+        # 日付単位の判定は ISO 日付文字列の辞書順比較で行う
+        today_iso = today.isoformat()
+        month_start_iso = month_start.date().isoformat()
+        since_24h_iso = twenty_four_hours_ago.date().isoformat()
+        since_30d_iso = thirty_days_ago.date().isoformat()
+
+        # 日付ごとのチャートデータを初期化
+        chart_dates = self._chart_dates(today, days)
+        revenue_chart: dict[str, dict[str, float]] = {
+            date_str: {"revenue": 0.0, "subscriptions": 0.0, "credits": 0.0}
+            for date_str in chart_dates
+        }
+        usage_chart: dict[str, dict[str, int]] = {
+            date_str: {"generations": 0, "api_calls": 0, "errors": 0}
+            for date_str in chart_dates
+        }
+
+        # --- サブスクリプション（収益・MRR・収益チャート） ---
+        # 作成日ごとの売上（ヒストグラム）に畳み込み、月/日/チャートの判定は日付の種類数だけ行う
         active_mrr = 0.0
+        subscription_day_revenue: Counter[str] = Counter()
 
-        for sub_data in subscriptions.values() if isinstance(subscriptions, dict) else subscriptions:
-            if isinstance(sub_data, dict):
-                plan = sub_data.get("plan", "free")
-                status = sub_data.get("status", "")
-                created_str = sub_data.get("created_at", "")
+        for sub_data in self._iter_dicts(subscriptions):
+            plan = sub_data.get("plan", "free")
+            created_str = sub_data.get("created_at", "")
 
-                price = self.PLAN_PRICES.get(plan, 0.0)
+            price = self.PLAN_PRICES.get(plan, 0.0)
 
-                if status == "active":
-                    active_mrr += price
+            if sub_data.get("status", "") == "active":
+                active_mrr += price
 
-                # 作成日が今月以降ならカウント
-                if created_str:
-                    try:
-                        created = datetime.fromisoformat(created_str.replace("Z", "+00:00"))
-                        if created >= month_start:
-                            monthly_subscription_revenue += price
-                        if created.date() == today:
-                            daily_subscription_revenue += price
-                        subscription_revenue += price
-                    except Exception:
-                        pass
+            subscription_day_revenue[_date_key(created_str) or ""] += price
 
-        # クレジット収益計算
+        subscription_revenue, monthly_subscription_revenue, daily_subscription_revenue = (
+            self._fold_day_revenue(
+                subscription_day_revenue, revenue_chart, "subscriptions", month_start_iso, today_iso
+            )
+        )
+
+        # --- クレジット（収益・収益チャート） ---
         credit_revenue = 0.0
-        monthly_credit_revenue = 0.0
-        daily_credit_revenue = 0.0
-
-        for credit_data in credits_data.values() if isinstance(credits_data, dict) else credits_data:
-            if isinstance(credit_data, dict):
-                transactions = credit_data.get("transactions", [])
-                for tx in transactions:
-                    if tx.get("type") == "purchase":
-                        amount = tx.get("amount", 0)
-                        # クレジット数から収益を推定（1クレジット≒$0.50）
-                        tx_revenue = amount * 0.5
-                        credit_revenue += tx_revenue
-
-                        tx_date_str = tx.get("timestamp", "")
-                        if tx_date_str:
-                            try:
-                                tx_date = datetime.fromisoformat(tx_date_str.replace("Z", "+00:00"))
-                                if tx_date >= month_start:
-                                    monthly_credit_revenue += tx_revenue
-                                if tx_date.date() == today:
-                                    daily_credit_revenue += tx_revenue
-                            except Exception:
-                                pass
+        credit_day_revenue: Counter[str] = Counter()
+
+        for credit_data in self._iter_dicts(credits_data):
+            transactions = credit_data.get("transactions", [])
+            for tx in transactions:
+                if tx.get("type") == "purchase":
+                    amount = tx.get("amount", 0)
+                    # クレジット数から収益を推定（1クレジット≒$0.50）
+                    tx_revenue = amount * 0.5
+                    credit_revenue += tx_revenue
+
+                    timestamp_str = tx.get("timestamp", "")
+                    credit_day_revenue[_date_key(timestamp_str) or ""] += tx_revenue
+
+        _, monthly_credit_revenue, daily_credit_revenue = self._fold_day_revenue(
+            credit_day_revenue, revenue_chart, "credits", month_start_iso, today_iso
+        )
 
         total_revenue = subscription_revenue + credit_revenue
         monthly_revenue = monthly_subscription_revenue + monthly_credit_revenue
         daily_revenue = daily_subscription_revenue + daily_credit_revenue
 
-        return RevenueMetrics(
+        revenue = RevenueMetrics(
             total_revenue=round(total_revenue, 2),
             monthly_revenue=round(monthly_revenue, 2),
             daily_revenue=round(daily_revenue, 2),
@@ -144,60 +336,56 @@ class AdminDashboard:
             arr=round(active_mrr * 12, 2),
         )
 
-    def get_user_metrics(self) -> UserMetrics:
-        """ユーザーメトリクスを取得"""
-        api_keys = self._load_json(self.api_keys_file)
-        subscriptions = self._load_json(self.subscriptions_file)
-
-        now = datetime.now()
-        today = now.date()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        thirty_days_ago = now - timedelta(days=30)
-
+        # --- APIキー（ユーザー・プラン分布） ---
         total_users = 0
         active_users = 0
         new_users_today = 0
         new_users_month = 0
         paying_users = 0
         free_users = 0
+        distribution = {
+            "free": 0,
+            "basic": 0,
+            "pro": 0,
+            "enterprise": 0,
+        }
 
-        for key_id, key_data in api_keys.items() if isinstance(api_keys, dict) else enumerate(api_keys):
-            if isinstance(key_data, dict):
-                total_users += 1
-
-                tier = key_data.get("tier", "free")
-                if tier in ["basic", "pro", "enterprise"]:
-                    paying_users += 1
-                else:
-                    free_users += 1
-
-                created_str = key_data.get("created_at", "")
-                last_used_str = key_data.get("last_used", "")
-
-                if created_str:
-                    try:
-                        created = datetime.fromisoformat(created_str.replace("Z", "+00:00"))
-                        if created >= month_start:
-                            new_users_month += 1
-                        if created.date() == today:
-                            new_users_today += 1
-                    except Exception:
-                        pass
-
-                if last_used_str:
-                    try:
-                        last_used = datetime.fromisoformat(last_used_str.replace("Z", "+00:00"))
-                        if last_used >= thirty_days_ago:
-                            active_users += 1
-                    except Exception:
-                        pass
+        for key_data in self._iter_dicts(api_keys):
+            total_users += 1
+
+            tier = key_data.get("tier", "free")
+            if tier in ["basic", "pro", "enterprise"]:
+                paying_users += 1
+            else:
+                free_users += 1
+            if tier in distribution:
+                distribution[tier] += 1
+
+            created_day = _date_key(key_data.get("created_at", ""))
+            last_used_str = key_data.get("last_used", "")
+
+            if created_day:
+                if created_day >= month_start_iso:
+                    new_users_month += 1
+                if created_day == today_iso:
+                    new_users_today += 1
+
+            # 30日より前の日付は時刻を解析せずに非アクティブと判定する
+            last_used_day = _date_key(last_used_str)
+            if last_used_str and not (last_used_day and last_used_day < since_30d_iso):
+                try:
+                    last_used = datetime.fromisoformat(last_used_str)
+                    if last_used >= thirty_days_ago:
+                        active_users += 1
+                except Exception:
+                    pass
 
         # 解約率（仮の計算: 過去30日で非アクティブになったユーザーの割合）
         churn_rate = 0.0
         if total_users > 0:
             churn_rate = ((total_users - active_users) / total_users) * 100
 
-        return UserMetrics(
+        users = UserMetrics(
             total_users=total_users,
             active_users=active_users,
             new_users_today=new_users_today,
@@ -207,59 +395,75 @@ class AdminDashboard:
             churn_rate=round(churn_rate, 2),
         )
 
-    def get_usage_metrics(self) -> UsageMetrics:
-        """使用量メトリクスを取得"""
-        usage_records = self._load_json(self.usage_file)
-        api_keys = self._load_json(self.api_keys_file)
-
-        now = datetime.now()
-        today = now.date()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        # --- 使用量レコード（使用量・使用量チャート・ヘルス） ---
+        error_count_24h = 0
+        total_response_time = 0.0
+        response_count = 0
 
+        # レコードを1件ずつ読みながら日別件数（ヒストグラム）に畳み込む
+        # （日付キーは _date_key で検証し、不正な日付は空文字にまとめる。
+        #   月/日/チャートの判定は日付の種類数だけ行う）
         total_generations = 0
-        monthly_generations = 0
-        daily_generations = 0
-        api_calls_today = 0
         total_errors = 0
-        daily_errors = 0
-
-        records = usage_records if isinstance(usage_records, list) else []
+        day_counts: Counter[str] = Counter()
+        error_day_counts: Counter[str] = Counter()
+        recent: list[tuple[str, bool, Any]] = []  # 前日以降のレコード（24時間判定用）
+
+        for record in self._iter_usage_records():
+            total_generations += 1
+            timestamp_str = record.get("timestamp")
+            day = _date_key(timestamp_str) or ""
+            is_failed = not record.get("success", True)
+
+            day_counts[day] += 1
+            if is_failed:
+                total_errors += 1
+                error_day_counts[day] += 1
+            if day >= since_24h_iso:
+                recent.append((timestamp_str, is_failed, record.get("response_time_ms", 0)))
 
-        for record in records:
-            if isinstance(record, dict):
-                total_generations += 1
-
-                timestamp_str = record.get("timestamp", "")
-                success = record.get("success", True)
-
-                if not success:
-                    total_errors += 1
-
-                if timestamp_str:
-                    try:
-                        timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-                        if timestamp >= month_start:
-                            monthly_generations += 1
-                        if timestamp.date() == today:
-                            daily_generations += 1
-                            api_calls_today += 1
-                            if not success:
-                                daily_errors += 1
-                    except Exception:
-                        pass
+        monthly_generations = 0
+        daily_generations = 0
+        for day, count in day_counts.items():
+            if not day:
+                continue
+            if day >= month_start_iso:
+                monthly_generations += count
+            if day == today_iso:
+                daily_generations += count
+            bucket = usage_chart.get(day)
+            if bucket is not None:
+                bucket["generations"] = count
+                bucket["api_calls"] = count
+                bucket["errors"] = error_day_counts[day]
+        api_calls_today = daily_generations
+
+        # 24時間以内の判定は時刻が必要なため、前日以降のレコードのみ解析する
+        # （不正な日付のレコードは日付キーが空文字のため recent に含まれない）
+        for timestamp_str, is_failed, response_time in recent:
+            try:
+                timestamp = datetime.fromisoformat(timestamp_str)
+                if timestamp >= twenty_four_hours_ago:
+                    if is_failed:
+                        error_count_24h += 1
+                    if response_time > 0:
+                        total_response_time += response_time
+                        response_count += 1
+            except Exception:
+                pass
 
         # ユーザーあたり平均生成回数
-        total_users = len(api_keys) if isinstance(api_keys, dict) else 0
+        key_count = len(api_keys) if isinstance(api_keys, dict) else 0
         average_per_user = 0.0
-        if total_users > 0:
-            average_per_user = total_generations / total_users
+        if key_count > 0:
+            average_per_user = total_generations / key_count
 
         # エラー率
         error_rate = 0.0
         if total_generations > 0:
             error_rate = (total_errors / total_generations) * 100
 
-        return UsageMetrics(
+        usage = UsageMetrics(
             total_generations=total_generations,
             monthly_generations=monthly_generations,
             daily_generations=daily_generations,
@@ -268,278 +472,173 @@ class AdminDashboard:
             error_rate=round(error_rate, 2),
         )
 
-    def get_plan_distribution(self) -> PlanDistribution:
-        """プラン分布を取得"""
-        api_keys = self._load_json(self.api_keys_file)
+        avg_response_time = 0.0
+        if response_count > 0:
+            avg_response_time = total_response_time / response_count
 
-        distribution = {
-            "free": 0,
-            "basic": 0,
-            "pro": 0,
-            "enterprise": 0,
-        }
+        # ステータス判定（仮: エラー率で判定）
+        api_status = "healthy"
+        if error_count_24h > 100:
+            api_status = "degraded"
+        elif error_count_24h > 500:
+            api_status = "down"
 
-        for key_data in api_keys.values() if isinstance(api_keys, dict) else api_keys:
-            if isinstance(key_data, dict):
-                tier = key_data.get("tier", "free")
-                if tier in distribution:
-                    distribution[tier] += 1
+        health = SystemHealth(
+            api_status=api_status,
+            database_status="healthy",  # JSONベースのため常にhealthy
+            gemini_api_status="unknown",  # 実際のAPI呼び出しで確認が必要
+            stripe_status="unknown",  # 実際のAPI呼び出しで確認が必要
+            error_count_24h=error_count_24h,
+            avg_response_time_ms=round(avg_response_time, 2),
+        )
+
+        return _AllMetrics(
+            revenue=revenue,
+            users=users,
+            usage=usage,
+            plan_distribution=PlanDistribution(**distribution),
+            revenue_chart=[
+                RevenueChartData(
+                    date=date_str,
+                    revenue=round(data["revenue"], 2),
+                    subscriptions=round(data["subscriptions"], 2),
+                    credits=round(data["credits"], 2),
+                )
+                for date_str, data in revenue_chart.items()
+            ],
+            usage_chart=[
+                UsageChartData(
+                    date=date_str,
+                    generations=data["generations"],
+                    api_calls=data["api_calls"],
+                    errors=data["errors"],
+                )
+                for date_str, data in usage_chart.items()
+            ],
+            health=health,
+            computed_at=now.astimezone(UTC),
+        )
 
-        return PlanDistribution(**distribution)
+    def get_revenue_metrics(self) -> RevenueMetrics:
+        """収益メトリクスを取得"""
+        return self._compute_all().revenue
+
+    def get_user_metrics(self) -> UserMetrics:
+        """ユーザーメトリクスを取得"""
+        return self._compute_all().users
+
+    def get_usage_metrics(self) -> UsageMetrics:
+        """使用量メトリクスを取得"""
+        return self._compute_all().usage
+
+    def get_plan_distribution(self) -> PlanDistribution:
+        """プラン分布を取得"""
+        return self._compute_all().plan_distribution
 
     def get_dashboard_summary(self) -> DashboardSummary:
         """ダッシュボード概要を取得"""
+        metrics = self._compute_all()
         return DashboardSummary(
-            revenue=self.get_revenue_metrics(),
-            users=self.get_user_metrics(),
-            usage=self.get_usage_metrics(),
-            plan_distribution=self.get_plan_distribution(),
-            last_updated=datetime.now(),
+            revenue=metrics.revenue,
+            users=metrics.users,
+            usage=metrics.usage,
+            plan_distribution=metrics.plan_distribution,
+            last_updated=metrics.computed_at,
         )
 
+    @_cached_metric("api_keys_file", "usage_file")
     def get_user_list(self, page: int = 1, per_page: int = 20, plan_filter: Optional[str] = None) -> dict:
         """ユーザー一覧を取得"""
         api_keys = self._load_json(self.api_keys_file)
-        subscriptions = self._load_json(self.subscriptions_file)
-        usage_records = self._load_json(self.usage_file)
 
         # ユーザーごとの使用量を集計
-        usage_by_user: dict[str, int] = {}
-        for record in usage_records if isinstance(usage_records, list) else []:
-            if isinstance(record, dict):
-                key_id = record.get("key_id", "")
-                if key_id:
-                    usage_by_user[key_id] = usage_by_user.get(key_id, 0) + 1
+        usage_by_user = Counter(
+            key_id
+            for record in self._iter_usage_records()
+            if (key_id := record.get("key_id"))
+        )
 
-        users = []
+        # 作成日だけを先に求め、UserListItem は表示するページ分のみ生成する
+        now = datetime.now()
+        rows = []
         for key_id, key_data in api_keys.items() if isinstance(api_keys, dict) else []:
             if isinstance(key_data, dict):
-                tier = key_data.get("tier", "free")
-
                 # フィルター適用
-                if plan_filter and tier != plan_filter:
+                if plan_filter and key_data.get("tier", "free") != plan_filter:
                     continue
 
                 created_str = key_data.get("created_at", "")
-                last_used_str = key_data.get("last_used", "")
-
-                created_at = datetime.now()
-                last_active = None
-
+                created_at = now
                 if created_str:
                     try:
-                        created_at = datetime.fromisoformat(created_str.replace("Z", "+00:00"))
+                        created_at = datetime.fromisoformat(created_str)
                     except Exception:
                         pass
 
-                if last_used_str:
-                    try:
-                        last_active = datetime.fromisoformat(last_used_str.replace("Z", "+00:00"))
-                    except Exception:
-                        pass
-
-                # 使用量と推定支出
-                total_gen = usage_by_user.get(key_id, 0)
-                total_spent = self.PLAN_PRICES.get(tier, 0.0)
-
-                users.append(UserListItem(
-                    user_id=key_id,
-                    email=key_data.get("email"),
-                    plan=tier,
-                    created_at=created_at,
-                    last_active=last_active,
-                    total_generations=total_gen,
-                    total_spent=total_spent,
-                    is_active=key_data.get("is_active", True),
-                ))
-
-        # ソート（作成日降順）
-        users.sort(key=lambda u: u.created_at, reverse=True)
+                rows.append((created_at, key_id, key_data))
 
         # ページネーション
-        total = len(users)
+        total = len(rows)
         total_pages = (total + per_page - 1) // per_page
         start = (page - 1) * per_page
         end = start + per_page
 
+        # 作成日降順の上位 end 件のみ部分ソート（sorted(..., reverse=True)[:end] と同順）
+        users = []
+        for created_at, key_id, key_data in heapq.nlargest(end, rows, key=itemgetter(0))[start:end]:
+            tier = key_data.get("tier", "free")
+            last_used_str = key_data.get("last_used", "")
+
+            last_active = None
+            if last_used_str:
+                try:
+                    last_active = datetime.fromisoformat(last_used_str)
+                except Exception:
+                    pass
+
+            # 使用量と推定支出
+            users.append(UserListItem(
+                user_id=key_id,
+                email=key_data.get("email"),
+                plan=tier,
+                created_at=created_at,
+                last_active=last_active,
+                total_generations=usage_by_user.get(key_id, 0),
+                total_spent=self.PLAN_PRICES.get(tier, 0.0),
+                is_active=key_data.get("is_active", True),
+            ))
+
         return {
-            "users": users[start:end],
+            "users": users,
             "total": total,
             "page": page,
             "per_page": per_page,
             "total_pages": total_pages,
         }
 
+
     def get_revenue_chart_data(self, days: int = 30) -> list[RevenueChartData]:
         """収益チャートデータを取得"""
-        subscriptions = self._load_json(self.subscriptions_file)
-        credits_data = self._load_json(self.credits_file)
-
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days - 1)
-
-        # 日付ごとのデータを初期化
-        chart_data: dict[str, dict[str, float]] = {}
-        current = start_date
-        while current <= end_date:
-            date_str = current.isoformat()
-            chart_data[date_str] = {"revenue": 0.0, "subscriptions": 0.0, "credits": 0.0}
-            current += timedelta(days=1)
-
-        # サブスクリプション収益を日付ごとに集計
-        for sub_data in subscriptions.values() if isinstance(subscriptions, dict) else subscriptions:
-            if isinstance(sub_data, dict):
-                created_str = sub_data.get("created_at", "")
-                plan = sub_data.get("plan", "free")
-                price = self.PLAN_PRICES.get(plan, 0.0)
-
-                if created_str and price > 0:
-                    try:
-                        created = datetime.fromisoformat(created_str.replace("Z", "+00:00"))
-                        date_str = created.date().isoformat()
-                        if date_str in chart_data:
-                            chart_data[date_str]["subscriptions"] += price
-                            chart_data[date_str]["revenue"] += price
-                    except Exception:
-                        pass
-
-        # クレジット収益を日付ごとに集計
-        for credit_data in credits_data.values() if isinstance(credits_data, dict) else credits_data:
-            if isinstance(credit_data, dict):
-                transactions = credit_data.get("transactions", [])
-                for tx in transactions:
-                    if tx.get("type") == "purchase":
-                        amount = tx.get("amount", 0)
-                        tx_revenue = amount * 0.5
-                        tx_date_str = tx.get("timestamp", "")
-
-                        if tx_date_str:
-                            try:
-                                tx_date = datetime.fromisoformat(tx_date_str.replace("Z", "+00:00"))
-                                date_str = tx_date.date().isoformat()
-                                if date_str in chart_data:
-                                    chart_data[date_str]["credits"] += tx_revenue
-                                    chart_data[date_str]["revenue"] += tx_revenue
-                            except Exception:
-                                pass
-
-        # リストに変換
-        result = []
-        for date_str in sorted(chart_data.keys()):
-            data = chart_data[date_str]
-            result.append(RevenueChartData(
-                date=date_str,
-                revenue=round(data["revenue"], 2),
-                subscriptions=round(data["subscriptions"], 2),
-                credits=round(data["credits"], 2),
-            ))
-
-        return result
+        return self._compute_all(days).revenue_chart
 
     def get_usage_chart_data(self, days: int = 30) -> list[UsageChartData]:
         """使用量チャートデータを取得"""
-        usage_records = self._load_json(self.usage_file)
-
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days - 1)
-
-        # 日付ごとのデータを初期化
-        chart_data: dict[str, dict[str, int]] = {}
-        current = start_date
-        while current <= end_date:
-            date_str = current.isoformat()
-            chart_data[date_str] = {"generations": 0, "api_calls": 0, "errors": 0}
-            current += timedelta(days=1)
-
-        # 使用量を日付ごとに集計
-        records = usage_records if isinstance(usage_records, list) else []
-        for record in records:
-            if isinstance(record, dict):
-                timestamp_str = record.get("timestamp", "")
-                success = record.get("success", True)
-
-                if timestamp_str:
-                    try:
-                        timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-                        date_str = timestamp.date().isoformat()
-                        if date_str in chart_data:
-                            chart_data[date_str]["generations"] += 1
-                            chart_data[date_str]["api_calls"] += 1
-                            if not success:
-                                chart_data[date_str]["errors"] += 1
-                    except Exception:
-                        pass
-
-        # リストに変換
-        result = []
-        for date_str in sorted(chart_data.keys()):
-            data = chart_data[date_str]
-            result.append(UsageChartData(
-                date=date_str,
-                generations=data["generations"],
-                api_calls=data["api_calls"],
-                errors=data["errors"],
-            ))
-
-        return result
+        return self._compute_all(days).usage_chart
 
     def get_system_health(self) -> SystemHealth:
         """システムヘルス情報を取得"""
-        usage_records = self._load_json(self.usage_file)
-
-        now = datetime.now()
-        twenty_four_hours_ago = now - timedelta(hours=24)
-
-        error_count_24h = 0
-        total_response_time = 0.0
-        response_count = 0
+        return self._compute_all().health
 
-        records = usage_records if isinstance(usage_records, list) else []
-        for record in records:
-            if isinstance(record, dict):
-                timestamp_str = record.get("timestamp", "")
-                success = record.get("success", True)
-                response_time = record.get("response_time_ms", 0)
-
-                if timestamp_str:
-                    try:
-                        timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-                        if timestamp >= twenty_four_hours_ago:
-                            if not success:
-                                error_count_24h += 1
-                            if response_time > 0:
-                                total_response_time += response_time
-                                response_count += 1
-                    except Exception:
-                        pass
-
-        avg_response_time = 0.0
-        if response_count > 0:
-            avg_response_time = total_response_time / response_count
-
-        # ステータス判定（仮: エラー率で判定）
-        api_status = "healthy"
-        if error_count_24h > 100:
-            api_status = "degraded"
-        elif error_count_24h > 500:
-            api_status = "down"
-
-        return SystemHealth(
-            api_status=api_status,
-            database_status="healthy",  # JSONベースのため常にhealthy
-            gemini_api_status="unknown",  # 実際のAPI呼び出しで確認が必要
-            stripe_status="unknown",  # 実際のAPI呼び出しで確認が必要
-            error_count_24h=error_count_24h,
-            avg_response_time_ms=round(avg_response_time, 2),
-        )
 
+    @_cached_metric("contacts_file")
     def get_contact_stats(self) -> dict:
         """お問い合わせ統計を取得"""
         contacts = self._load_json(self.contacts_file)
 
         now = datetime.now()
-        today = now.date()
+        today_iso = now.date().isoformat()
         week_ago = now - timedelta(days=7)
+        week_ago_iso = week_ago.date().isoformat()
 
         total = 0
         today_count = 0
@@ -548,22 +647,23 @@ class AdminDashboard:
         unread = 0
 
         records = contacts if isinstance(contacts, list) else []
-        for record in records:
-            if isinstance(record, dict):
-                total += 1
-                category = record.get("category", "other")
-                by_category[category] = by_category.get(category, 0) + 1
-
-                if not record.get("read", False):
-                    unread += 1
-
-                timestamp_str = record.get("timestamp", "")
-                if timestamp_str:
+        for record in filter(_is_dict, records):
+            total += 1
+            category = record.get("category", "other")
+            by_category[category] = by_category.get(category, 0) + 1
+
+            if not record.get("read", False):
+                unread += 1
+
+            timestamp_str = record.get("timestamp", "")
+            timestamp_day = _date_key(timestamp_str)
+            if timestamp_day:
+                if timestamp_day == today_iso:
+                    today_count += 1
+                # 7日以内の判定は時刻が必要なため、境界日以降のレコードのみ解析する
+                if timestamp_day >= week_ago_iso:
                     try:
-                        timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-                        if timestamp.date() == today:
-                            today_count += 1
-                        if timestamp >= week_ago:
+                        if datetime.fromisoformat(timestamp_str) >= week_ago:
                             week_count += 1
                     except Exception:
                         pass
@@ -4,14 +4,15 @@ VisionCraftAI - 管理者APIルート
 """
 
 import os
-import hashlib
+import hmac
 import logging
 from typing import Optional
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException, Depends, Header, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 
+from .._json import dumps as _json_dumps
 from .dashboard import AdminDashboard
 from .schemas import (
     DashboardSummary,
@@ -54,13 +55,8 @@ def verify_admin_auth(x_admin_secret: Optional[str] = Header(None)) -> bool:
             detail={"error": "UNAUTHORIZED", "message": "管理者認証が必要です"},
         )
 
-    expected_secret = get_admin_secret()
-
-    # タイミング攻撃を防ぐためにハッシュ比較
-    provided_hash = hashlib.sha256(x_admin_secret.encode()).hexdigest()
-    expected_hash = hashlib.sha256(expected_secret.encode()).hexdigest()
-
-    if provided_hash != expected_hash:
+    # タイミング攻撃を防ぐため定数時間で比較
+    if not hmac.compare_digest(x_admin_secret.encode(), get_admin_secret().encode()):
         raise HTTPException(
             status_code=403,
             detail={"error": "FORBIDDEN", "message": "管理者認証に失敗しました"},
@@ -69,13 +65,20 @@ def verify_admin_auth(x_admin_secret: Optional[str] = Header(None)) -> bool:
     return True
 
 
+# AdminDashboardインスタンス（メトリクスキャッシュをリクエスト間で共有する）
+_dashboard: Optional[AdminDashboard] = None
+
+
 def get_dashboard() -> AdminDashboard:
-    """AdminDashboardインスタンスを取得"""
-    return AdminDashboard()
+    """AdminDashboardのシングルトンを取得"""
+    global _dashboard
+    if _dashboard is None:
+        _dashboard = AdminDashboard()
+    return _dashboard
 
 
 @router.get("/dashboard", response_model=DashboardSummary)
-async def get_dashboard_summary(
+def get_dashboard_summary(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
 ) -> DashboardSummary:
@@ -92,7 +95,7 @@ async def get_dashboard_summary(
 
 
 @router.get("/revenue", response_model=RevenueMetrics)
-async def get_revenue_metrics(
+def get_revenue_metrics(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
 ) -> RevenueMetrics:
@@ -105,7 +108,7 @@ async def get_revenue_metrics(
 
 
 @router.get("/users", response_model=UserMetrics)
-async def get_user_metrics(
+def get_user_metrics(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
 ) -> UserMetrics:
@@ -118,7 +121,7 @@ async def get_user_metrics(
 
 
 @router.get("/usage", response_model=UsageMetrics)
-async def get_usage_metrics(
+def get_usage_metrics(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
 ) -> UsageMetrics:
@@ -131,7 +134,7 @@ async def get_usage_metrics(
 
 
 @router.get("/plans", response_model=PlanDistribution)
-async def get_plan_distribution(
+def get_plan_distribution(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
 ) -> PlanDistribution:
@@ -144,7 +147,7 @@ async def get_plan_distribution(
 
 
 @router.get("/users/list", response_model=UserListResponse)
-async def get_user_list(
+def get_user_list(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
     page: int = Query(1, ge=1, description="ページ番号"),
@@ -161,7 +164,7 @@ async def get_user_list(
 
 
 @router.get("/charts/revenue", response_model=list[RevenueChartData])
-async def get_revenue_chart(
+def get_revenue_chart(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
     days: int = Query(30, ge=1, le=365, description="過去N日間のデータ"),
@@ -175,7 +178,7 @@ async def get_revenue_chart(
 
 
 @router.get("/charts/usage", response_model=list[UsageChartData])
-async def get_usage_chart(
+def get_usage_chart(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
     days: int = Query(30, ge=1, le=365, description="過去N日間のデータ"),
@@ -189,7 +192,7 @@ async def get_usage_chart(
 
 
 @router.get("/health", response_model=SystemHealth)
-async def get_system_health(
+def get_system_health(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
 ) -> SystemHealth:
@@ -202,7 +205,7 @@ async def get_system_health(
 
 
 @router.get("/contacts/stats")
-async def get_contact_stats(
+def get_contact_stats(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
 ) -> dict:
@@ -215,14 +218,16 @@ async def get_contact_stats(
 
 
 @router.get("/export")
-async def export_dashboard_data(
+def export_dashboard_data(
     _: bool = Depends(verify_admin_auth),
     dashboard: AdminDashboard = Depends(get_dashboard),
     format: str = Query("json", description="エクスポート形式（json）"),
-) -> dict:
+) -> Response:
     """
     ダッシュボードデータをエクスポート
 
+    JSON は一度だけシリアライズし、バイト列のまま返します。
+
     Args:
         format: エクスポート形式
 
@@ -235,13 +240,14 @@ async def export_dashboard_data(
         usage_chart = dashboard.get_usage_chart_data(days=30)
         contact_stats = dashboard.get_contact_stats()
 
-        return {
+        content = _json_dumps({
             "exported_at": datetime.now().isoformat(),
-            "summary": summary.model_dump(),
-            "revenue_chart": [r.model_dump() for r in revenue_chart],
-            "usage_chart": [u.model_dump() for u in usage_chart],
+            "summary": summary.model_dump(mode="json"),
+            "revenue_chart": [r.model_dump(mode="json") for r in revenue_chart],
+            "usage_chart": [u.model_dump(mode="json") for u in usage_chart],
             "contact_stats": contact_stats,
-        }
+        })
+        return Response(content=content, media_type="application/json")
     except Exception as e:
         logger.error(f"エクスポートエラー: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3,12 +3,22 @@
 VisionCraftAI - 管理者APIスキーマ
 """
 
-from datetime import datetime
+from datetime import datetime, UTC
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
-class RevenueMetrics(BaseModel):
+def _utcnow() -> datetime:
+    """現在のUTC時刻を返す（タイムゾーン対応）"""
+    return datetime.now(UTC)
+
+
+class _FrozenModel(BaseModel):
+    """管理者APIレスポンス共通基底（生成後に変更しないDTO）"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+
+class RevenueMetrics(_FrozenModel):
     """収益メトリクス"""
     total_revenue: float = Field(..., description="累計収益（USD）")
     monthly_revenue: float = Field(..., description="今月の収益（USD）")
@@ -19,7 +29,7 @@ class RevenueMetrics(BaseModel):
     arr: float = Field(..., description="年次経常収益（ARR）")
 
 
-class UserMetrics(BaseModel):
+class UserMetrics(_FrozenModel):
     """ユーザーメトリクス"""
     total_users: int = Field(..., description="総ユーザー数")
     active_users: int = Field(..., description="アクティブユーザー数（30日以内）")
@@ -30,7 +40,7 @@ class UserMetrics(BaseModel):
     churn_rate: float = Field(..., description="解約率（%）")
 
 
-class UsageMetrics(BaseModel):
+class UsageMetrics(_FrozenModel):
     """使用量メトリクス"""
     total_generations: int = Field(..., description="累計生成回数")
     monthly_generations: int = Field(..., description="今月の生成回数")
@@ -40,7 +50,7 @@ class UsageMetrics(BaseModel):
     error_rate: float = Field(..., description="エラー率（%）")
 
 
-class PlanDistribution(BaseModel):
+class PlanDistribution(_FrozenModel):
     """プラン分布"""
     free: int = Field(..., description="Freeプランユーザー数")
     basic: int = Field(..., description="Basicプランユーザー数")
@@ -48,16 +58,16 @@ class PlanDistribution(BaseModel):
     enterprise: int = Field(..., description="Enterpriseプランユーザー数")
 
 
-class DashboardSummary(BaseModel):
+class DashboardSummary(_FrozenModel):
     """ダッシュボード概要"""
     revenue: RevenueMetrics
     users: UserMetrics
     usage: UsageMetrics
     plan_distribution: PlanDistribution
-    last_updated: datetime = Field(default_factory=datetime.now)
+    last_updated: datetime = Field(default_factory=_utcnow)
 
 
-class UserListItem(BaseModel):
+class UserListItem(_FrozenModel):
     """ユーザー一覧アイテム"""
     user_id: str
     email: Optional[str] = None
@@ -69,7 +79,7 @@ class UserListItem(BaseModel):
     is_active: bool
 
 
-class UserListResponse(BaseModel):
+class UserListResponse(_FrozenModel):
     """ユーザー一覧レスポンス"""
     users: list[UserListItem]
     total: int
@@ -78,7 +88,7 @@ class UserListResponse(BaseModel):
     total_pages: int
 
 
-class RevenueChartData(BaseModel):
+class RevenueChartData(_FrozenModel):
     """収益チャートデータ"""
     date: str
     revenue: float
@@ -86,7 +96,7 @@ class RevenueChartData(BaseModel):
     credits: float
 
 
-class UsageChartData(BaseModel):
+class UsageChartData(_FrozenModel):
     """使用量チャートデータ"""
     date: str
     generations: int
@@ -94,7 +104,7 @@ class UsageChartData(BaseModel):
     errors: int
 
 
-class SystemHealth(BaseModel):
+class SystemHealth(_FrozenModel):
     """システムヘルス"""
     api_status: str = Field(..., description="API状態（healthy/degraded/down）")
     database_status: str = Field(..., description="データベース状態")
@@ -6,10 +6,13 @@ A/Bテストの管理とユーザー行動分析機能を提供します。
 """
 
 import hashlib
+import heapq
 import logging
 import random
-from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta, UTC
+from itertools import pairwise
 from typing import Optional
 
 
@@ -40,6 +43,8 @@ class ABTestManager:
         self._tests: dict[str, ABTest] = {}
         self._assignments: dict[str, dict[str, ABTestAssignment]] = defaultdict(dict)
         # user_id -> {test_id -> assignment}
+        self._test_users: dict[str, set[str]] = defaultdict(set)
+        # test_id -> {user_id}（テスト削除時の割り当て削除用）
 
     def create_test(
         self,
@@ -72,15 +77,15 @@ class ABTestManager:
         offset: int = 0,
     ) -> list[ABTest]:
         """A/Bテスト一覧を取得"""
-        tests = list(self._tests.values())
+        tests = self._tests.values()
 
         if status:
-            tests = [t for t in tests if t.status == status]
+            tests = (t for t in tests if t.status == status)
 
-        # 作成日時降順でソート
-        tests.sort(key=lambda t: t.created_at, reverse=True)
+        # 作成日時降順で、必要なページまでの上位だけを取り出す
+        top = heapq.nlargest(offset + limit, tests, key=lambda t: t.created_at)
 
-        return tests[offset : offset + limit]
+        return top[offset : offset + limit]
 
     def add_variant(
         self,
@@ -172,10 +177,12 @@ class ABTestManager:
         if not test or not test.is_active:
             return None
 
-        # 既存の割り当てをチェック
-        existing = self._assignments.get(user_id, {}).get(test_id)
-        if existing:
-            return existing
+        # 既存の割り当てをチェック（未割り当てユーザーで空の辞書を作らない）
+        user_assignments = self._assignments.get(user_id)
+        if user_assignments is not None:
+            existing = user_assignments.get(test_id)
+            if existing:
+                return existing
 
         # バリアント選択
         variant = self._select_variant(test, user_id, force_variant_id)
@@ -191,6 +198,7 @@ class ABTestManager:
 
         # 保存
         self._assignments[user_id][test_id] = assignment
+        self._test_users[test_id].add(user_id)
 
         # インプレッション記録
         variant.impressions += 1
@@ -214,25 +222,16 @@ class ABTestManager:
 
         # 強制指定がある場合
         if force_variant_id:
-            for v in test.variants:
-                if v.id == force_variant_id:
-                    return v
-            return None
+            return test.get_variant(force_variant_id)
 
         # ユーザーIDをハッシュして0-100の値を生成
-        # セキュリティ目的ではないため usedforsecurity=False を指定
+        # 16進文字列を経由せず、64ビットのダイジェストを直接整数に変換する
         hash_input = f"{test.id}:{user_id}"
-        hash_value = int(hashlib.md5(hash_input.encode(), usedforsecurity=False).hexdigest(), 16) % 100
+        digest = hashlib.blake2b(hash_input.encode(), digest_size=8).digest()
+        hash_value = int.from_bytes(digest, "little") % 100
 
         # 重みに基づいてバリアントを選択
-        cumulative_weight = 0.0
-        for variant in test.variants:
-            cumulative_weight += variant.weight
-            if hash_value < cumulative_weight:
-                return variant
-
-        # フォールバック（最後のバリアント）
-        return test.variants[-1]
+        return test.variant_picker(hash_value)
 
     def get_assignment(
         self,
@@ -240,7 +239,10 @@ class ABTestManager:
         user_id: str,
     ) -> Optional[ABTestAssignment]:
         """割り当てを取得"""
-        return self._assignments.get(user_id, {}).get(test_id)
+        user_assignments = self._assignments.get(user_id)
+        if user_assignments is None:
+            return None
+        return user_assignments.get(test_id)
 
     def record_conversion(
         self,
@@ -253,7 +255,9 @@ class ABTestManager:
         if not assignment:
             return False
 
-        if assignment.converted:
+        # 初回コンバージョンかどうかは更新前に判定する
+        was_converted = assignment.converted
+        if was_converted:
             # 既にコンバージョン済み - 収益のみ加算
             assignment.revenue += revenue
         else:
@@ -264,12 +268,11 @@ class ABTestManager:
         # テストのバリアント統計を更新
         test = self.get_test(test_id)
         if test:
-            for variant in test.variants:
-                if variant.id == assignment.variant_id:
-                    if not assignment.converted:
-                        variant.conversions += 1
-                    variant.revenue += revenue
-                    break
+            variant = test.get_variant(assignment.variant_id)
+            if variant:
+                if not was_converted:
+                    variant.conversions += 1
+                variant.revenue += revenue
 
         logger.info(f"コンバージョン記録: {user_id} ({test_id}) - ¥{revenue}")
         return True
@@ -284,14 +287,15 @@ class ABTestManager:
 
         # 統計的有意性の計算（簡易版）
         results["has_sufficient_sample"] = (
-            test.total_impressions >= test.minimum_sample_size
+            results["total_impressions"] >= test.minimum_sample_size
         )
 
-        # 勝者がある場合、改善率を計算
-        if test.winner and len(test.variants) >= 2:
+        # 勝者がある場合、改善率を計算（勝者は to_dict の結果を再利用）
+        winner_id = results["winner_id"]
+        if winner_id and len(test.variants) >= 2:
             # コントロール（最初のバリアント）との比較
             control = test.variants[0]
-            winner = test.winner
+            winner = test.get_variant(winner_id)
 
             if control.conversion_rate > 0:
                 improvement = (
@@ -310,10 +314,9 @@ class ABTestManager:
         if test_id not in self._tests:
             return False
 
-        # 関連する割り当ても削除
-        for user_assignments in self._assignments.values():
-            if test_id in user_assignments:
-                del user_assignments[test_id]
+        # 関連する割り当ても削除（このテストに割り当てられたユーザーのみ）
+        for user_id in self._test_users.pop(test_id, ()):
+            self._assignments[user_id].pop(test_id, None)
 
         del self._tests[test_id]
         logger.info(f"A/Bテスト削除: {test_id}")
@@ -323,11 +326,30 @@ class ABTestManager:
 class AnalyticsTracker:
     """ユーザー行動分析トラッカー"""
 
-    def __init__(self):
-        """初期化"""
+    # 上限超過時に追加で削除する割合（インデックス再構築の頻度を抑える）
+    EVICTION_RATIO = 0.1
+
+    def __init__(self, max_events: int = 1_000_000):
+        """
+        初期化
+
+        Args:
+            max_events: 保持するイベントの上限（超過時は古いものから削除。日次統計は残る）
+        """
+        self.max_events = max_events
+
         # インメモリストレージ（本番ではDBを使用）
+        # イベントは時刻順に保持し、期間検索は _timestamps の二分探索で行う
         self._events: list[AnalyticsEvent] = []
+        self._timestamps: list[datetime] = []
         self._goals: dict[str, ConversionGoal] = {}
+        # イベントタイプ別のゴール（イベント記録時に該当ゴールだけを更新する）
+        self._goals_by_type: dict[EventType, list[ConversionGoal]] = defaultdict(list)
+
+        # 検索用インデックス（各リストは記録順）
+        self._by_user: dict[str, list[AnalyticsEvent]] = defaultdict(list)
+        self._by_type: dict[EventType, list[AnalyticsEvent]] = defaultdict(list)
+        self._by_day: dict[str, list[AnalyticsEvent]] = defaultdict(list)
 
         # 集計キャッシュ
         self._daily_stats: dict[str, dict] = {}
@@ -352,49 +374,157 @@ class AnalyticsTracker:
             **kwargs
         )
 
-        self._events.append(event)
-        self._update_daily_stats(event)
-        self._update_goals(event)
+        self._insert_event(event)
+        self._index_event(event)
+        self._ingest(event)
 
-        # ログ出力（デバッグ用）
-        logger.debug(
-            f"イベント記録: {event.event_type.value} - "
-            f"user={user_id}, session={session_id}"
-        )
+        if len(self._events) > self.max_events:
+            self._evict_oldest()
+
+        # ログ出力（デバッグ用。無効時はメッセージを組み立てない）
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"イベント記録: {event._event_type_value} - "
+                f"user={user_id}, session={session_id}"
+            )
 
         return event
 
-    def _update_daily_stats(self, event: AnalyticsEvent):
-        """日次統計を更新"""
-        date_key = event.timestamp.strftime("%Y-%m-%d")
+    def track_events(self, events_spec: list[dict]) -> list[AnalyticsEvent]:
+        """
+        複数のイベントをまとめて記録
+
+        Args:
+            events_spec: track_event の引数（event_type, user_id 等）を格納した辞書のリスト
+
+        Returns:
+            記録したイベントのリスト（events_spec と同じ順序）
+        """
+        events = [AnalyticsEvent.create(**spec) for spec in events_spec]
+        if not events:
+            return events
+
+        # 時刻順に並んだバッチが既存イベントの後に続く場合は一括で追加
+        timestamps = [e.timestamp for e in events]
+        if (
+            (not self._timestamps or self._timestamps[-1] <= timestamps[0])
+            and all(a <= b for a, b in pairwise(timestamps))
+        ):
+            self._events.extend(events)
+            self._timestamps.extend(timestamps)
+        else:
+            for event in events:
+                self._insert_event(event)
+
+        by_day: dict[str, list[AnalyticsEvent]] = defaultdict(list)
+        for event in events:
+            self._index_event(event)
+            by_day[event._day_key].append(event)
+
+        # 日次統計は日付ごとにまとめて更新
+        for date_key, day_events in by_day.items():
+            stats = self._daily_stats_bucket(date_key)
+            stats["total_events"] += len(day_events)
+            stats["unique_users"].update(e.user_id for e in day_events if e.user_id)
+            stats["unique_sessions"].update(e.session_id for e in day_events if e.session_id)
+            event_counts = stats["event_counts"]
+            for type_value, count in Counter(e._event_type_value for e in day_events).items():
+                event_counts[type_value] += count
+            stats["revenue"] += sum((e.revenue for e in day_events), 0.0)
+
+        if self._goals_by_type:
+            for event in events:
+                for goal in self._goals_by_type.get(event.event_type, ()):
+                    goal.current_count += 1
+                    goal.current_value += event.revenue
+
+        if len(self._events) > self.max_events:
+            self._evict_oldest()
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"イベント一括記録: {len(events)}件")
 
-        if date_key not in self._daily_stats:
-            self._daily_stats[date_key] = {
+        return events
+
+    def _insert_event(self, event: AnalyticsEvent):
+        """イベントを時刻順を保って追加（通常は末尾への追加）"""
+        timestamp = event.timestamp
+        if not self._timestamps or self._timestamps[-1] <= timestamp:
+            self._events.append(event)
+            self._timestamps.append(timestamp)
+        else:
+            index = bisect_right(self._timestamps, timestamp)
+            self._events.insert(index, event)
+            self._timestamps.insert(index, timestamp)
+
+    def _evict_oldest(self):
+        """上限を超えたイベントを古い順に削除"""
+        evict_count = len(self._events) - self.max_events + int(self.max_events * self.EVICTION_RATIO)
+        del self._events[:evict_count]
+        self._rebuild_indexes()
+        logger.info(f"イベント上限超過のため古いイベントを削除: {evict_count}件")
+
+    def _time_range(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+    ) -> tuple[int, int]:
+        """期間内のイベントの範囲 [lo, hi) を二分探索で求める"""
+        lo = bisect_left(self._timestamps, start_date) if start_date else 0
+        hi = bisect_right(self._timestamps, end_date) if end_date else len(self._timestamps)
+        return lo, hi
+
+    def _index_event(self, event: AnalyticsEvent):
+        """イベントを検索用インデックスに追加"""
+        if event.user_id:
+            self._by_user[event.user_id].append(event)
+        self._by_type[event.event_type].append(event)
+        self._by_day[event._day_key].append(event)
+
+    def _rebuild_indexes(self):
+        """検索用インデックスを再構築"""
+        self._by_user.clear()
+        self._by_type.clear()
+        self._by_day.clear()
+        self._timestamps = [e.timestamp for e in self._events]
+        for event in self._events:
+            self._index_event(event)
+
+    def _daily_stats_bucket(self, date_key: str) -> dict:
+        """指定日の日次統計を取得（なければ作成）"""
+        stats = self._daily_stats.get(date_key)
+        if stats is None:
+            stats = self._daily_stats[date_key] = {
                 "total_events": 0,
                 "unique_users": set(),
                 "unique_sessions": set(),
                 "event_counts": defaultdict(int),
                 "revenue": 0.0,
             }
+        return stats
+
+    def _ingest(self, event: AnalyticsEvent):
+        """日次統計とゴール進捗を更新"""
+        revenue = event.revenue
+        user_id = event.user_id
+        session_id = event.session_id
+        date_key = event._day_key
 
-        stats = self._daily_stats[date_key]
+        stats = self._daily_stats_bucket(date_key)
         stats["total_events"] += 1
 
-        if event.user_id:
-            stats["unique_users"].add(event.user_id)
+        if user_id:
+            stats["unique_users"].add(user_id)
 
-        if event.session_id:
-            stats["unique_sessions"].add(event.session_id)
+        if session_id:
+            stats["unique_sessions"].add(session_id)
 
-        stats["event_counts"][event.event_type.value] += 1
-        stats["revenue"] += event.revenue
+        stats["event_counts"][event._event_type_value] += 1
+        stats["revenue"] += revenue
 
-    def _update_goals(self, event: AnalyticsEvent):
-        """ゴールの進捗を更新"""
-        for goal in self._goals.values():
-            if event.event_type == goal.event_type:
-                goal.current_count += 1
-                goal.current_value += event.revenue
+        for goal in self._goals_by_type.get(event.event_type, ()):
+            goal.current_count += 1
+            goal.current_value += revenue
 
     def create_goal(
         self,
@@ -421,6 +551,7 @@ class AnalyticsTracker:
             period_days=period_days,
         )
         self._goals[goal_id] = goal
+        self._goals_by_type[event_type].append(goal)
         logger.info(f"ゴール作成: {goal_id} ({name})")
         return goal
 
@@ -443,7 +574,16 @@ class AnalyticsTracker:
         offset: int = 0,
     ) -> list[AnalyticsEvent]:
         """イベントを検索"""
+        # 期間で切り出した範囲とインデックスのうち、件数が最も少ないものを起点に絞り込む
+        lo, hi = self._time_range(start_date, end_date)
         events = self._events
+        if user_id:
+            events = min(events, self._by_user.get(user_id, []), key=len)
+        if event_type:
+            events = min(events, self._by_type.get(event_type, []), key=len)
+        if hi - lo <= len(events):
+            events = self._events[lo:hi]
+            start_date = end_date = None  # 期間の条件は切り出しで適用済み
 
         if user_id:
             events = [e for e in events if e.user_id == user_id]
@@ -460,10 +600,10 @@ class AnalyticsTracker:
         if end_date:
             events = [e for e in events if e.timestamp <= end_date]
 
-        # 時刻降順でソート
-        events.sort(key=lambda e: e.timestamp, reverse=True)
+        # 時刻降順で、必要なページまでの上位だけを取り出す（インデックス・保存順は変更しない）
+        top = heapq.nlargest(offset + limit, events, key=lambda e: e.timestamp)
 
-        return events[offset : offset + limit]
+        return top[offset : offset + limit]
 
     def get_daily_stats(
         self,
@@ -503,25 +643,14 @@ class AnalyticsTracker:
         end_date = _utcnow()
         start_date = end_date - timedelta(days=days)
 
-        # 期間内のイベントを集計
-        events = self.get_events(
-            start_date=start_date,
-            end_date=end_date,
-            limit=10000,
-        )
-
-        unique_users = set()
-        unique_sessions = set()
-        event_counts: dict[str, int] = defaultdict(int)
-        total_revenue = 0.0
+        # 期間内のイベントを集計（時刻順の保存領域から二分探索で切り出す）
+        lo, hi = self._time_range(start_date, end_date)
+        events = self._events[lo:hi]
 
-        for event in events:
-            if event.user_id:
-                unique_users.add(event.user_id)
-            if event.session_id:
-                unique_sessions.add(event.session_id)
-            event_counts[event.event_type.value] += 1
-            total_revenue += event.revenue
+        unique_users = {e.user_id for e in events if e.user_id}
+        unique_sessions = {e.session_id for e in events if e.session_id}
+        event_counts = Counter(e._event_type_value for e in events)
+        total_revenue = sum((e.revenue for e in events), 0.0)
 
         return {
             "period_days": days,
@@ -547,25 +676,21 @@ class AnalyticsTracker:
         if not end_date:
             end_date = _utcnow()
 
-        # ユーザーごとのイベントを取得
-        user_events: dict[str, list[AnalyticsEvent]] = defaultdict(list)
-        for event in self._events:
-            if event.user_id and start_date <= event.timestamp <= end_date:
-                user_events[event.user_id].append(event)
-
         # 各ステップのユーザー数をカウント
+        # 期間内のイベントは時刻順のため、1回の走査でユーザーごとの到達ステップを進める
         step_users: list[set] = [set() for _ in steps]
-
-        for user_id, events in user_events.items():
-            # 時刻順にソート
-            events.sort(key=lambda e: e.timestamp)
-
-            # ステップを順番に通過したかチェック
-            current_step = 0
-            for event in events:
-                if current_step < len(steps) and event.event_type == steps[current_step]:
-                    step_users[current_step].add(user_id)
-                    current_step += 1
+        current_steps: dict[str, int] = {}
+        step_count = len(steps)
+
+        lo, hi = self._time_range(start_date, end_date)
+        for event in self._events[lo:hi]:
+            user_id = event.user_id
+            if not user_id:
+                continue
+            current_step = current_steps.get(user_id, 0)
+            if current_step < step_count and event.event_type == steps[current_step]:
+                step_users[current_step].add(user_id)
+                current_steps[user_id] = current_step + 1
 
         # 結果を構築
         funnel_steps = []
@@ -610,8 +735,8 @@ class AnalyticsTracker:
 
         # コホート日にイベントがあったユーザーを特定
         cohort_day = cohort_date.strftime("%Y-%m-%d")
-        for event in self._events:
-            if event.user_id and event.timestamp.strftime("%Y-%m-%d") == cohort_day:
+        for event in self._by_day.get(cohort_day, []):
+            if event.user_id:
                 cohort_users.add(event.user_id)
 
         if not cohort_users:
@@ -625,14 +750,13 @@ class AnalyticsTracker:
         retention_data = []
         for period in range(periods + 1):
             target_date = (cohort_date + timedelta(days=period)).strftime("%Y-%m-%d")
-            retained_users = set()
 
-            for event in self._events:
-                if (
-                    event.user_id in cohort_users
-                    and event.timestamp.strftime("%Y-%m-%d") == target_date
-                ):
-                    retained_users.add(event.user_id)
+            # 対象日のイベントのみを日付インデックスから参照する
+            retained_users = {
+                event.user_id
+                for event in self._by_day.get(target_date, [])
+                if event.user_id in cohort_users
+            }
 
             retention_rate = 0.0
             if cohort_users:
@@ -659,13 +783,16 @@ class AnalyticsTracker:
         """イベントを削除"""
         initial_count = len(self._events)
 
+        # 期間の切り出しは _timestamps と対応する絞り込み前のリストに対して行う
+        if before_date:
+            self._events = self._events[bisect_left(self._timestamps, before_date):]
+
         if user_id:
             self._events = [e for e in self._events if e.user_id != user_id]
 
-        if before_date:
-            self._events = [e for e in self._events if e.timestamp >= before_date]
-
         deleted = initial_count - len(self._events)
+        if deleted:
+            self._rebuild_indexes()
         logger.info(f"イベント削除: {deleted}件")
         return deleted
 
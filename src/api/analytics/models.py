@@ -5,11 +5,12 @@ VisionCraftAI - 分析・A/Bテストモデル
 A/Bテストとユーザー行動分析のデータモデルを定義します。
 """
 
+from bisect import bisect_right
 from dataclasses import dataclass, field
 from datetime import datetime, UTC
-from enum import Enum
-from typing import Optional
-import hashlib
+from enum import StrEnum
+from itertools import accumulate
+from typing import Callable, Optional
 import secrets
 
 
@@ -18,7 +19,7 @@ def _utcnow() -> datetime:
     return datetime.now(UTC)
 
 
-class ABTestStatus(str, Enum):
+class ABTestStatus(StrEnum):
     """A/Bテストの状態"""
     DRAFT = "draft"            # 下書き
     RUNNING = "running"        # 実行中
@@ -27,7 +28,7 @@ class ABTestStatus(str, Enum):
     ARCHIVED = "archived"      # アーカイブ
 
 
-class EventType(str, Enum):
+class EventType(StrEnum):
     """イベントタイプ"""
     PAGE_VIEW = "page_view"
     BUTTON_CLICK = "button_click"
@@ -48,7 +49,7 @@ class EventType(str, Enum):
     CUSTOM = "custom"
 
 
-class ConversionGoalType(str, Enum):
+class ConversionGoalType(StrEnum):
     """コンバージョンゴールタイプ"""
     SIGN_UP = "sign_up"
     PURCHASE = "purchase"
@@ -58,7 +59,7 @@ class ConversionGoalType(str, Enum):
     CUSTOM = "custom"
 
 
-@dataclass
+@dataclass(slots=True)
 class ABTestVariant:
     """A/Bテストのバリアント（テストパターン）"""
     id: str
@@ -88,22 +89,22 @@ class ABTestVariant:
         return self.revenue / self.impressions
 
     def to_dict(self) -> dict:
-        """辞書に変換"""
+        """辞書に変換（float のフィールドは整数が入っていても float で返す）"""
         return {
             "id": self.id,
             "name": self.name,
             "description": self.description,
-            "weight": self.weight,
+            "weight": float(self.weight),
             "config": self.config,
             "impressions": self.impressions,
             "conversions": self.conversions,
-            "revenue": self.revenue,
+            "revenue": float(self.revenue),
             "conversion_rate": self.conversion_rate,
             "revenue_per_impression": self.revenue_per_impression,
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ABTest:
     """A/Bテスト"""
     id: str
@@ -129,6 +130,19 @@ class ABTest:
     minimum_sample_size: int = 100
     confidence_level: float = 0.95  # 95%信頼区間
 
+    # バリアント選択用の累積重みテーブル（バリアント追加時に破棄）
+    _cumulative_weights: Optional[list[float]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # ハッシュ値(0-100)→バリアントの選択関数（重みの正規化時に破棄）
+    _variant_picker: Optional[Callable[[float], ABTestVariant]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # ID→バリアントの索引（バリアント追加時に破棄）
+    _variants_by_id: Optional[dict[str, ABTestVariant]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
     @classmethod
     def create(
         cls,
@@ -166,17 +180,27 @@ class ABTest:
             config=config or {},
         )
         self.variants.append(variant)
+        self._variants_by_id = None
         self._normalize_weights()
         return variant
 
+    def get_variant(self, variant_id: str) -> Optional[ABTestVariant]:
+        """IDでバリアントを取得"""
+        if self._variants_by_id is None:
+            self._variants_by_id = {v.id: v for v in self.variants}
+        return self._variants_by_id.get(variant_id)
+
     def _normalize_weights(self):
         """重みを正規化（合計100%）"""
+        self._cumulative_weights = None
+        self._variant_picker = None
         if not self.variants:
             return
         total_weight = sum(v.weight for v in self.variants)
         if total_weight > 0:
+            scale = 100.0 / total_weight
             for v in self.variants:
-                v.weight = (v.weight / total_weight) * 100.0
+                v.weight *= scale
 
     def start(self):
         """テストを開始"""
@@ -209,6 +233,38 @@ class ABTest:
         """テストがアクティブか"""
         return self.status == ABTestStatus.RUNNING
 
+    @property
+    def cumulative_weights(self) -> list[float]:
+        """バリアントの累積重み（variants と同じ順序）"""
+        if self._cumulative_weights is None:
+            self._cumulative_weights = list(accumulate(v.weight for v in self.variants))
+        return self._cumulative_weights
+
+    @property
+    def variant_picker(self) -> Callable[[float], ABTestVariant]:
+        """
+        ハッシュ値からバリアントを選ぶ関数
+
+        バリアントが2〜3個の場合は累積重みとの比較を展開した関数を、
+        それ以外は累積重みの二分探索を行う関数を返す。
+        累積重みが100に届かない場合は最後のバリアントにフォールバックする。
+        """
+        if self._variant_picker is None:
+            variants = self.variants
+            cumulative = self.cumulative_weights
+            if len(variants) == 2:
+                v0, v1 = variants
+                c0 = cumulative[0]
+                self._variant_picker = lambda h: v0 if h < c0 else v1
+            elif len(variants) == 3:
+                v0, v1, v2 = variants
+                c0, c1 = cumulative[0], cumulative[1]
+                self._variant_picker = lambda h: v0 if h < c0 else (v1 if h < c1 else v2)
+            else:
+                last = len(variants) - 1
+                self._variant_picker = lambda h: variants[min(bisect_right(cumulative, h), last)]
+        return self._variant_picker
+
     @property
     def total_impressions(self) -> int:
         """総表示回数"""
@@ -222,27 +278,33 @@ class ABTest:
     @property
     def total_revenue(self) -> float:
         """総収益"""
-        return sum(v.revenue for v in self.variants)
+        return float(sum(v.revenue for v in self.variants))
 
     @property
     def winner(self) -> Optional[ABTestVariant]:
         """勝者バリアント（最高コンバージョン率）"""
+        return self._pick_winner(self.total_impressions)
+
+    def _pick_winner(self, total_impressions: int) -> Optional[ABTestVariant]:
+        """集計済みの総表示回数から勝者バリアントを決定"""
         if not self.variants:
             return None
         # サンプルサイズが足りない場合はNone
-        if self.total_impressions < self.minimum_sample_size:
+        if total_impressions < self.minimum_sample_size:
             return None
         return max(self.variants, key=lambda v: v.conversion_rate)
 
     def to_dict(self) -> dict:
-        """辞書に変換"""
+        """辞書に変換（集計値と勝者は1回だけ計算する）"""
+        total_impressions = self.total_impressions
+        winner = self._pick_winner(total_impressions)
         return {
             "id": self.id,
             "name": self.name,
             "description": self.description,
-            "status": self.status.value,
+            "status": self.status,
             "variants": [v.to_dict() for v in self.variants],
-            "goal_type": self.goal_type.value,
+            "goal_type": self.goal_type,
             "goal_event": self.goal_event,
             "start_date": self.start_date.isoformat() if self.start_date else None,
             "end_date": self.end_date.isoformat() if self.end_date else None,
@@ -250,15 +312,15 @@ class ABTest:
             "updated_at": self.updated_at.isoformat(),
             "created_by": self.created_by,
             "minimum_sample_size": self.minimum_sample_size,
-            "confidence_level": self.confidence_level,
-            "total_impressions": self.total_impressions,
+            "confidence_level": float(self.confidence_level),
+            "total_impressions": total_impressions,
             "total_conversions": self.total_conversions,
             "total_revenue": self.total_revenue,
-            "winner_id": self.winner.id if self.winner else None,
+            "winner_id": winner.id if winner else None,
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ABTestAssignment:
     """ユーザーへのA/Bテスト割り当て"""
     user_id: str
@@ -282,7 +344,7 @@ class ABTestAssignment:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalyticsEvent:
     """分析イベント"""
     id: str
@@ -324,6 +386,16 @@ class AnalyticsEvent:
     revenue: float = 0.0
     currency: str = "USD"
 
+    # 日付キー（YYYY-MM-DD）。日別集計で strftime を呼ばずに済むよう作成時に求める
+    _day_key: str = field(init=False, repr=False, compare=False)
+    # イベントタイプの値（集計・シリアライズ用に作成時に取り出しておく）
+    _event_type_value: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        t = self.timestamp
+        self._day_key = f"{t.year:04d}-{t.month:02d}-{t.day:02d}"
+        self._event_type_value = self.event_type.value
+
     @classmethod
     def create(
         cls,
@@ -332,25 +404,60 @@ class AnalyticsEvent:
         session_id: Optional[str] = None,
         event_name: str = "",
         event_data: Optional[dict] = None,
-        **kwargs
+        *,
+        page_url: str = "",
+        page_title: str = "",
+        referrer: str = "",
+        user_agent: str = "",
+        device_type: str = "",
+        browser: str = "",
+        os: str = "",
+        country: str = "",
+        region: str = "",
+        city: str = "",
+        utm_source: str = "",
+        utm_medium: str = "",
+        utm_campaign: str = "",
+        utm_term: str = "",
+        utm_content: str = "",
+        timestamp: Optional[datetime] = None,
+        revenue: float = 0.0,
+        currency: str = "USD",
     ) -> "AnalyticsEvent":
         """イベントを作成"""
-        event_id = f"evt_{secrets.token_hex(12)}"
+        # 記録ごとに呼ばれるため、フィールドの宣言順どおりに位置引数で渡す
         return cls(
-            id=event_id,
-            event_type=event_type,
-            user_id=user_id,
-            session_id=session_id,
-            event_name=event_name,
-            event_data=event_data or {},
-            **kwargs
+            f"evt_{secrets.token_hex(12)}",
+            event_type,
+            user_id,
+            session_id,
+            event_name,
+            event_data or {},
+            page_url,
+            page_title,
+            referrer,
+            user_agent,
+            device_type,
+            browser,
+            os,
+            country,
+            region,
+            city,
+            utm_source,
+            utm_medium,
+            utm_campaign,
+            utm_term,
+            utm_content,
+            _utcnow() if timestamp is None else timestamp,
+            revenue,
+            currency,
         )
 
     def to_dict(self) -> dict:
         """辞書に変換"""
         return {
             "id": self.id,
-            "event_type": self.event_type.value,
+            "event_type": self._event_type_value,
             "user_id": self.user_id,
             "session_id": self.session_id,
             "event_name": self.event_name,
@@ -376,7 +483,7 @@ class AnalyticsEvent:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversionGoal:
     """コンバージョンゴール"""
     id: str
@@ -418,8 +525,8 @@ class ConversionGoal:
             "id": self.id,
             "name": self.name,
             "description": self.description,
-            "goal_type": self.goal_type.value,
-            "event_type": self.event_type.value,
+            "goal_type": self.goal_type,
+            "event_type": self.event_type,
             "target_value": self.target_value,
             "target_count": self.target_count,
             "period_days": self.period_days,
@@ -10,7 +10,9 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response
 
+from src.api._json import dumps as _json_dumps
 from src.api.analytics.manager import (
     ABTestManager,
     AnalyticsTracker,
@@ -45,6 +47,30 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
 
+def _ab_test_json(content: dict, status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    A/Bテストの辞書をJSONレスポンスにする
+
+    to_dict() はサーバー側で組み立てた ABTestResponse と同じ構造の辞書を返すため、
+    response_model による再検証を省いてそのままシリアライズする
+    （response_model はAPIドキュメント用に残す）。
+    """
+    return Response(
+        content=_json_dumps(content),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+# イベントタイプ一覧は起動後に変わらないため、レスポンス本文を事前に生成しておく
+_EVENT_TYPES_JSON = _json_dumps({
+    "event_types": [
+        {"value": t.value, "name": t.name}
+        for t in EventType
+    ]
+})
+
+
 # ==================== A/Bテストエンドポイント ====================
 
 
@@ -77,7 +103,7 @@ async def create_ab_test(
             config=variant_data.config,
         )
 
-    return test.to_dict()
+    return _ab_test_json(test.to_dict(), status_code=status.HTTP_201_CREATED)
 
 
 @router.get(
@@ -94,10 +120,10 @@ async def list_ab_tests(
 ):
     """A/Bテスト一覧を取得"""
     tests = manager.list_tests(status=status, limit=limit, offset=offset)
-    return {
+    return _ab_test_json({
         "tests": [t.to_dict() for t in tests],
         "total": len(tests),
-    }
+    })
 
 
 @router.get(
@@ -117,7 +143,7 @@ async def get_ab_test(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="A/Bテストが見つかりません",
         )
-    return test.to_dict()
+    return _ab_test_json(test.to_dict())
 
 
 @router.post(
@@ -176,7 +202,7 @@ async def start_ab_test(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="テストを開始できません。バリアントが2つ以上必要です。",
         )
-    return manager.get_test(test_id).to_dict()
+    return _ab_test_json(manager.get_test(test_id).to_dict())
 
 
 @router.post(
@@ -195,7 +221,7 @@ async def pause_ab_test(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="A/Bテストが見つかりません",
         )
-    return manager.get_test(test_id).to_dict()
+    return _ab_test_json(manager.get_test(test_id).to_dict())
 
 
 @router.post(
@@ -214,7 +240,7 @@ async def resume_ab_test(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="A/Bテストが見つかりません",
         )
-    return manager.get_test(test_id).to_dict()
+    return _ab_test_json(manager.get_test(test_id).to_dict())
 
 
 @router.post(
@@ -233,7 +259,7 @@ async def complete_ab_test(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="A/Bテストが見つかりません",
         )
-    return manager.get_test(test_id).to_dict()
+    return _ab_test_json(manager.get_test(test_id).to_dict())
 
 
 @router.get(
@@ -546,11 +572,6 @@ async def get_goal(
     summary="イベントタイプ一覧",
     description="利用可能なイベントタイプの一覧を取得します。",
 )
-async def list_event_types():
+async def list_event_types() -> Response:
     """イベントタイプ一覧を取得"""
-    return {
-        "event_types": [
-            {"value": t.value, "name": t.name}
-            for t in EventType
-        ]
-    }
+    return Response(content=_EVENT_TYPES_JSON, media_type="application/json")
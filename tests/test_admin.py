@@ -139,6 +139,7 @@ class TestAdminDashboard:
         assert metrics.total_users == 3
         assert metrics.paying_users == 2  # basic + pro
         assert metrics.free_users == 1
+        assert metrics.active_users == 2  # key3 は40日間未使用
 
     def test_get_usage_metrics_empty(self, temp_data_dir):
         """使用量メトリクス（データなし）"""
@@ -174,6 +175,36 @@ class TestAdminDashboard:
         assert summary.usage is not None
         assert summary.plan_distribution is not None
 
+    def test_dashboard_summary_last_updated(self, temp_data_dir, sample_api_keys):
+        """ダッシュボード概要の更新時刻はメトリクスの集計時刻"""
+        dashboard = AdminDashboard(data_dir=temp_data_dir)
+        first = dashboard.get_dashboard_summary()
+        assert dashboard.get_dashboard_summary().last_updated == first.last_updated
+        assert first.last_updated.utcoffset() == timedelta(0)
+
+    def test_metric_cache_is_bounded(self, temp_data_dir, sample_api_keys):
+        """メトリクスキャッシュが上限件数を超えないことのテスト"""
+        dashboard = AdminDashboard(data_dir=temp_data_dir)
+        dashboard.CACHE_MAX_ENTRIES = 3
+        for page in range(1, 6):
+            dashboard.get_user_list(page=page, per_page=1)
+        assert len(dashboard._metric_cache) == 3
+
+        # 最近使ったものは残る
+        dashboard.get_user_list(page=3, per_page=1)
+        dashboard.get_user_list(page=6, per_page=1)
+        pages = {dict(key[1])["page"] for key in dashboard._metric_cache}
+        assert pages == {3, 5, 6}
+
+    def test_cached_metrics_are_frozen(self, temp_data_dir):
+        """キャッシュされたメトリクスは変更できない"""
+        dashboard = AdminDashboard(data_dir=temp_data_dir)
+        revenue = dashboard.get_revenue_metrics()
+        with pytest.raises(ValueError):
+            revenue.total_revenue = 1.0
+        with pytest.raises(ValueError):
+            PlanDistribution(free=0, basic=0, pro=0, enterprise=0, trial=0)
+
     def test_get_user_list(self, temp_data_dir, sample_api_keys):
         """ユーザー一覧"""
         dashboard = AdminDashboard(data_dir=temp_data_dir)
@@ -232,6 +263,17 @@ class TestAdminEndpoints:
         )
         assert response.status_code == 403
 
+    def test_admin_secret_rotation(self, client, admin_headers):
+        """管理者シークレットの変更が再起動なしで反映されるテスト"""
+        assert client.get("/api/v1/admin/health", headers=admin_headers).status_code == 200
+        with patch.dict(os.environ, {"ADMIN_SECRET": "rotated_secret"}):
+            assert client.get("/api/v1/admin/health", headers=admin_headers).status_code == 403
+            response = client.get(
+                "/api/v1/admin/health",
+                headers={"X-Admin-Secret": "rotated_secret"},
+            )
+            assert response.status_code == 200
+
     def test_dashboard_with_auth(self, client, admin_headers):
         """正常な認証でダッシュボードアクセス"""
         response = client.get("/api/v1/admin/dashboard", headers=admin_headers)
@@ -329,9 +371,44 @@ class TestAdminEndpoints:
         """エクスポートエンドポイント"""
         response = client.get("/api/v1/admin/export", headers=admin_headers)
         assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
         data = response.json()
         assert "exported_at" in data
         assert "summary" in data
+        assert len(data["revenue_chart"]) == 30
+
+    def test_export_loads_each_file_once(
+        self, client, admin_headers, temp_data_dir, sample_api_keys, sample_usage_records
+    ):
+        """エクスポートは各データファイルを1回だけ読み込む"""
+        from collections import Counter
+
+        from src.api.admin.routes import get_dashboard
+
+        dashboard = AdminDashboard(data_dir=temp_data_dir)
+        loads = Counter()
+        original_load = dashboard._load_json
+
+        def counting_load(file_path):
+            loads[file_path.name] += 1
+            return original_load(file_path)
+
+        app.dependency_overrides[get_dashboard] = lambda: dashboard
+        try:
+            with patch.object(dashboard, "_load_json", side_effect=counting_load):
+                response = client.get("/api/v1/admin/export", headers=admin_headers)
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        assert loads
+        assert all(count == 1 for count in loads.values()), loads
+
+    def test_get_dashboard_singleton(self):
+        """ダッシュボードインスタンスがリクエスト間で共有される"""
+        from src.api.admin.routes import get_dashboard
+
+        assert get_dashboard() is get_dashboard()
 
 
 class TestAdminPage:
@@ -630,6 +707,43 @@ class TestAdminDashboardAdvanced:
         assert metrics.total_users == 1
         assert metrics.paying_users == 1
 
+    def test_metrics_skip_nonexistent_dates(self, temp_data_dir):
+        """形式は合っていても実在しない日付は日別の集計から除外される"""
+        today = datetime.now().date().isoformat()
+        invalid_timestamps = [f"{today[:8]}99T00:00:00", "9999-13-01T00:00:00", f"{today}garbage"]
+        records = [{"key_id": "key1", "timestamp": ts, "success": True} for ts in invalid_timestamps]
+        records.append({"key_id": "key1", "timestamp": datetime.now().isoformat(), "success": True})
+        with open(temp_data_dir / "usage_records.json", "w", encoding="utf-8") as f:
+            json.dump(records, f)
+        subscriptions = {
+            f"sub{i}": {"plan": "basic", "status": "canceled", "created_at": ts}
+            for i, ts in enumerate(invalid_timestamps)
+        }
+        with open(temp_data_dir / "subscriptions.json", "w", encoding="utf-8") as f:
+            json.dump(subscriptions, f)
+
+        dashboard = AdminDashboard(data_dir=temp_data_dir)
+        usage = dashboard.get_usage_metrics()
+        assert usage.total_generations == 4
+        assert usage.monthly_generations == 1
+        assert usage.daily_generations == 1
+        revenue = dashboard.get_revenue_metrics()
+        assert revenue.total_revenue == 0.0
+        assert revenue.monthly_revenue == 0.0
+        assert sum(point.revenue for point in dashboard.get_revenue_chart_data()) == 0.0
+
+    def test_metrics_skip_non_dict_records(self, temp_data_dir):
+        """辞書でないレコードは集計から除外される"""
+        records = ["invalid", 1, None, {"key_id": "key1", "success": True}]
+        with open(temp_data_dir / "usage_records.json", "w", encoding="utf-8") as f:
+            json.dump(records, f)
+        with open(temp_data_dir / "subscriptions.json", "w", encoding="utf-8") as f:
+            json.dump({"sub1": "invalid", "sub2": {"plan": "pro", "status": "active"}}, f)
+
+        dashboard = AdminDashboard(data_dir=temp_data_dir)
+        assert dashboard.get_usage_metrics().total_generations == 1
+        assert dashboard.get_revenue_metrics().mrr == 29.99
+
     def test_usage_metrics_invalid_timestamp(self, temp_data_dir):
         """使用量メトリクス（不正なタイムスタンプ）"""
         records = [
@@ -666,6 +780,45 @@ class TestAdminDashboardAdvanced:
         assert stats["total"] == 1
         assert stats["today"] == 0  # 不正な日付のためカウントされない
 
+    def test_usage_metrics_utc_suffix_timestamp(self, temp_data_dir):
+        """使用量メトリクス（末尾 Z のタイムスタンプも日付で集計）"""
+        records = [
+            {
+                "key_id": "key1",
+                "timestamp": datetime.now().isoformat() + "Z",
+                "success": True,
+            },
+        ]
+        file_path = temp_data_dir / "usage_records.json"
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+        dashboard = AdminDashboard(data_dir=temp_data_dir)
+        metrics = dashboard.get_usage_metrics()
+        assert metrics.daily_generations == 1
+        assert metrics.monthly_generations == 1
+
+    def test_metrics_cached_until_file_changes(self, temp_data_dir, sample_api_keys):
+        """メトリクスキャッシュ（ファイル更新で再計算）"""
+        dashboard = AdminDashboard(data_dir=temp_data_dir)
+        first = dashboard.get_user_metrics()
+        assert dashboard.get_user_metrics() is first
+
+        data = dict(sample_api_keys, key4={"tier": "enterprise"})
+        with open(temp_data_dir / "api_keys.json", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+        updated = dashboard.get_user_metrics()
+        assert updated is not first
+        assert updated.total_users == 4
+
+    def test_metrics_cache_expires(self, temp_data_dir, sample_api_keys):
+        """メトリクスキャッシュ（TTL経過で再計算）"""
+        dashboard = AdminDashboard(data_dir=temp_data_dir)
+        dashboard.CACHE_TTL_SECONDS = 0
+        first = dashboard.get_plan_distribution()
+        assert dashboard.get_plan_distribution() is not first
+
 
 class TestAdminRoutesExceptionHandling:
     """管理者ルートの例外ハンドリングテスト（依存性注入オーバーライド）"""
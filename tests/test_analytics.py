@@ -5,6 +5,7 @@ VisionCraftAI - 分析・A/Bテストモジュールテスト
 A/Bテストと分析機能のテストを行います。
 """
 
+import json
 from datetime import datetime, timedelta, UTC
 
 import pytest
@@ -26,6 +27,7 @@ from src.api.analytics.models import (
     ConversionGoalType,
     EventType,
 )
+from src.api.analytics.schemas import ABTestResponse
 from src.api.app import app
 
 client = TestClient(app)
@@ -94,6 +96,14 @@ class TestABTest:
         assert test.status == ABTestStatus.DRAFT
         assert test.goal_type == ConversionGoalType.PURCHASE
 
+    def test_to_dict_enum_values(self):
+        """辞書変換時の列挙型が文字列値として扱われるテスト"""
+        test = ABTest.create(name="テスト", goal_type=ConversionGoalType.PURCHASE)
+        data = test.to_dict()
+        assert data["status"] == "draft"
+        assert f"{data['goal_type']}" == "purchase"
+        assert json.loads(json.dumps(data))["status"] == "draft"
+
     def test_add_variant(self):
         """バリアント追加テスト"""
         test = ABTest.create(name="テスト")
@@ -110,6 +120,31 @@ class TestABTest:
         total_weight = sum(v.weight for v in test.variants)
         assert abs(total_weight - 100.0) < 0.01
 
+    def test_cumulative_weights(self):
+        """累積重みテスト（バリアント追加で再計算）"""
+        test = ABTest.create(name="テスト")
+        test.add_variant(name="A", weight=30.0)
+        assert test.cumulative_weights == [100.0]
+
+        test.add_variant(name="B", weight=100.0)
+        assert test.cumulative_weights == [50.0, 100.0]
+
+    def test_variant_picker(self):
+        """バリアント選択関数が累積重みの境界どおりに選ぶテスト（2〜4バリアント）"""
+        cases = [
+            ([40.0, 60.0], [(0, 0), (39.9, 0), (40, 1), (99, 1)]),
+            ([10.0, 15.0, 75.0], [(9.9, 0), (10, 1), (24.9, 1), (25, 2), (99, 2)]),
+            ([10.0, 15.0, 25.0, 50.0], [(9.9, 0), (10, 1), (25, 2), (49.9, 2), (50, 3), (99, 3)]),
+        ]
+        for weights, expected in cases:
+            variants = [
+                ABTestVariant(id=f"var_{i}", name=f"V{i}", weight=w)
+                for i, w in enumerate(weights)
+            ]
+            test = ABTest(id="abt_picker", name="テスト", variants=variants)
+            for hash_value, index in expected:
+                assert test.variant_picker(hash_value) is variants[index]
+
     def test_start_test(self):
         """テスト開始テスト"""
         test = ABTest.create(name="テスト")
@@ -251,6 +286,43 @@ class TestAnalyticsEvent:
         assert data["user_id"] == "user_123"
         assert data["revenue"] == 29.99
 
+    def test_create_maps_all_fields(self):
+        """作成時に各引数が対応するフィールドに入るテスト"""
+        names = [
+            "page_url", "page_title", "referrer", "user_agent", "device_type",
+            "browser", "os", "country", "region", "city", "utm_source",
+            "utm_medium", "utm_campaign", "utm_term", "utm_content",
+        ]
+        timestamp = datetime(2026, 3, 9, tzinfo=UTC)
+        event = AnalyticsEvent.create(
+            EventType.PURCHASE, "user_1", "session_1", "buy", {"k": 1},
+            timestamp=timestamp, revenue=9.5, currency="JPY",
+            **{name: f"v_{name}" for name in names},
+        )
+        data = event.to_dict()
+        assert all(data[name] == f"v_{name}" for name in names)
+        assert (data["user_id"], data["session_id"], data["event_name"]) == ("user_1", "session_1", "buy")
+        assert data["event_data"] == {"k": 1}
+        assert event.timestamp == timestamp
+        assert (data["revenue"], data["currency"]) == (9.5, "JPY")
+
+    def test_cached_keys(self):
+        """作成時に求める日付キー・イベントタイプ値のテスト"""
+        event = AnalyticsEvent.create(
+            event_type=EventType.PAGE_VIEW,
+            timestamp=datetime(2026, 3, 9, 23, 59, tzinfo=UTC),
+        )
+        assert event._day_key == "2026-03-09"
+        assert "_day_key" not in event.to_dict()
+        assert event._event_type_value == "page_view"
+
+    def test_slots(self):
+        """インスタンスが属性辞書を持たないことのテスト"""
+        event = AnalyticsEvent.create(event_type=EventType.PAGE_VIEW)
+        assert not hasattr(event, "__dict__")
+        with pytest.raises(AttributeError):
+            event.unknown_field = 1
+
 
 class TestConversionGoal:
     """ConversionGoalモデルのテスト"""
@@ -339,6 +411,17 @@ class TestABTestManager:
         tests = manager.list_tests()
         assert len(tests) == 2
 
+    def test_list_tests_pagination(self, manager):
+        """作成日時降順のページ取得テスト"""
+        base = datetime(2026, 1, 1, tzinfo=UTC)
+        for i in range(5):
+            test = manager.create_test(name=f"テスト{i}")
+            test.created_at = base + timedelta(days=i)
+
+        page = manager.list_tests(limit=2, offset=1)
+        assert [t.name for t in page] == ["テスト3", "テスト2"]
+        assert manager.list_tests(limit=2, offset=10) == []
+
     def test_list_tests_by_status(self, manager):
         """ステータスでフィルタしたテスト一覧テスト"""
         test1 = manager.create_test(name="テスト1")
@@ -432,6 +515,26 @@ class TestABTestManager:
         assignment2 = manager.assign_variant(test.id, user_id="user_123")
 
         assert assignment1.variant_id == assignment2.variant_id
+        assert assignment1 is assignment2
+
+    def test_get_assignment_unknown_user(self, manager):
+        """未割り当てユーザーの取得で空の割り当てが作られないテスト"""
+        test = manager.create_test(name="テスト")
+        assert manager.get_assignment(test.id, "user_unknown") is None
+        assert "user_unknown" not in manager._assignments
+
+    def test_assign_variant_distribution(self, manager):
+        """ハッシュによる割り当てが重みに沿って分散するテスト"""
+        test = manager.create_test(name="テスト")
+        v1 = manager.add_variant(test.id, name="A", weight=50.0)
+        manager.add_variant(test.id, name="B", weight=50.0)
+        manager.start_test(test.id)
+
+        for i in range(1000):
+            manager.assign_variant(test.id, user_id=f"user_{i}")
+
+        # 1000人 × 重み（%）/ 100 の前後に収まる
+        assert abs(v1.impressions - v1.weight * 10) < 100
 
     def test_assign_variant_force(self, manager):
         """強制バリアント割り当てテスト"""
@@ -461,6 +564,22 @@ class TestABTestManager:
         assert assignment.converted is True
         assert assignment.revenue == 29.99
 
+    def test_record_conversion_counts_once(self, manager):
+        """コンバージョン数は初回のみ加算され、収益は毎回加算されるテスト"""
+        test = manager.create_test(name="テスト")
+        manager.add_variant(test.id, name="A", weight=50.0)
+        manager.add_variant(test.id, name="B", weight=50.0)
+        manager.start_test(test.id)
+
+        assignment = manager.assign_variant(test.id, user_id="user_123")
+        manager.record_conversion(test.id, "user_123", revenue=10.0)
+        manager.record_conversion(test.id, "user_123", revenue=5.0)
+
+        variant = test.get_variant(assignment.variant_id)
+        assert variant.conversions == 1
+        assert variant.revenue == 15.0
+        assert assignment.revenue == 15.0
+
     def test_get_test_results(self, manager):
         """テスト結果取得テスト"""
         test = manager.create_test(name="テスト")
@@ -480,6 +599,22 @@ class TestABTestManager:
         assert result is True
         assert manager.get_test(test.id) is None
 
+    def test_delete_test_removes_assignments(self, manager):
+        """テスト削除時に割り当ても削除されるテスト"""
+        tests = []
+        for name in ["テスト1", "テスト2"]:
+            test = manager.create_test(name=name)
+            manager.add_variant(test.id, name="A", weight=50.0)
+            manager.add_variant(test.id, name="B", weight=50.0)
+            manager.start_test(test.id)
+            manager.assign_variant(test.id, user_id="user_1")
+            tests.append(test)
+
+        manager.delete_test(tests[0].id)
+
+        assert manager.get_assignment(tests[0].id, "user_1") is None
+        assert manager.get_assignment(tests[1].id, "user_1") is not None
+
 
 class TestAnalyticsTracker:
     """AnalyticsTrackerのテスト"""
@@ -508,6 +643,33 @@ class TestAnalyticsTracker:
         )
         assert event.revenue == 99.99
 
+    def test_track_events_batch(self, tracker):
+        """イベント一括記録テスト（逐次記録と同じ集計結果になる）"""
+        base = datetime(2026, 1, 10, tzinfo=UTC)
+        specs = [
+            {"event_type": EventType.PAGE_VIEW, "user_id": "user_1", "timestamp": base},
+            {"event_type": EventType.PURCHASE, "user_id": "user_1", "revenue": 10.0,
+             "timestamp": base + timedelta(days=1)},
+            {"event_type": EventType.PURCHASE, "user_id": "user_2", "revenue": 5.0,
+             "timestamp": base + timedelta(hours=1)},
+        ]
+        goal = tracker.create_goal(name="購入目標", event_type=EventType.PURCHASE)
+        sequential = AnalyticsTracker()
+        for spec in specs:
+            sequential.track_event(**spec)
+
+        events = tracker.track_events(specs)
+
+        assert [e.user_id for e in events] == ["user_1", "user_1", "user_2"]
+        assert [e.timestamp for e in tracker.get_events()] == sorted(
+            (e.timestamp for e in events), reverse=True
+        )
+        period = {"start_date": base, "end_date": base + timedelta(days=1)}
+        assert tracker.get_daily_stats(**period) == sequential.get_daily_stats(**period)
+        assert goal.current_count == 2
+        assert goal.current_value == 15.0
+        assert tracker.track_events([]) == []
+
     def test_get_events(self, tracker):
         """イベント取得テスト"""
         tracker.track_event(EventType.PAGE_VIEW, user_id="user_1")
@@ -523,6 +685,28 @@ class TestAnalyticsTracker:
         purchases = tracker.get_events(event_type=EventType.PURCHASE)
         assert len(purchases) == 1
 
+    def test_get_events_date_range(self, tracker):
+        """期間指定のイベント取得テスト（時刻順でない記録を含む）"""
+        base = datetime(2026, 1, 10, tzinfo=UTC)
+        for days in [0, 5, 2, 8]:
+            tracker.track_event(
+                EventType.PAGE_VIEW,
+                user_id=f"user_{days}",
+                timestamp=base + timedelta(days=days),
+            )
+
+        events = tracker.get_events(
+            start_date=base + timedelta(days=1),
+            end_date=base + timedelta(days=5),
+        )
+        assert [e.user_id for e in events] == ["user_5", "user_2"]
+
+        events = tracker.get_events(user_id="user_8", start_date=base)
+        assert len(events) == 1
+
+        assert tracker.delete_events(before_date=base + timedelta(days=3)) == 2
+        assert [e.user_id for e in tracker.get_events()] == ["user_8", "user_5"]
+
     def test_get_daily_stats(self, tracker):
         """日次統計取得テスト"""
         tracker.track_event(EventType.PAGE_VIEW, user_id="user_1")
@@ -541,6 +725,17 @@ class TestAnalyticsTracker:
         assert summary["unique_users"] == 1
         assert summary["total_revenue"] == 29.99
 
+    def test_get_summary_counts_all_events(self, tracker):
+        """サマリー統計が期間内の全イベントを集計するテスト"""
+        for i in range(10_001):
+            tracker.track_event(EventType.PAGE_VIEW, user_id=f"user_{i % 3}")
+
+        summary = tracker.get_summary(days=1)
+        assert summary["total_events"] == 10_001
+        assert summary["unique_users"] == 3
+        assert summary["event_counts"] == {"page_view": 10_001}
+        assert summary["total_revenue"] == 0.0
+
     def test_create_goal(self, tracker):
         """ゴール作成テスト"""
         goal = tracker.create_goal(
@@ -563,6 +758,17 @@ class TestAnalyticsTracker:
         assert goal.current_count == 1
         assert goal.current_value == 29.99
 
+    def test_goal_ignores_other_event_types(self, tracker):
+        """別タイプのイベントではゴールが更新されないことのテスト"""
+        purchase_goal = tracker.create_goal(name="購入目標", event_type=EventType.PURCHASE)
+        signup_goal = tracker.create_goal(name="登録目標", event_type=EventType.SIGN_UP)
+
+        tracker.track_event(EventType.SIGN_UP, user_id="user_1")
+        tracker.track_event(EventType.PAGE_VIEW, user_id="user_1")
+
+        assert purchase_goal.current_count == 0
+        assert signup_goal.current_count == 1
+
     def test_get_funnel(self, tracker):
         """ファネル分析テスト"""
         # ユーザー1: ページビュー → サインアップ → 購入
@@ -586,6 +792,20 @@ class TestAnalyticsTracker:
         assert funnel["steps"][1]["user_count"] == 2  # サインアップ
         assert funnel["steps"][2]["user_count"] == 1  # 購入
 
+    def test_get_funnel_step_order(self, tracker):
+        """ファネル分析（時刻順に通過したステップのみ数える）テスト"""
+        base = datetime.now(UTC) - timedelta(days=1)
+        # ユーザー1: 購入の後にページビュー（記録順とは逆の時刻）
+        tracker.track_event(EventType.PAGE_VIEW, user_id="user_1", timestamp=base + timedelta(hours=2))
+        tracker.track_event(EventType.PURCHASE, user_id="user_1", timestamp=base + timedelta(hours=1))
+        # ユーザー2: ページビュー → 購入
+        tracker.track_event(EventType.PURCHASE, user_id="user_2", timestamp=base + timedelta(hours=4))
+        tracker.track_event(EventType.PAGE_VIEW, user_id="user_2", timestamp=base + timedelta(hours=3))
+
+        funnel = tracker.get_funnel(steps=[EventType.PAGE_VIEW, EventType.PURCHASE])
+
+        assert [step["user_count"] for step in funnel["steps"]] == [2, 1]
+
     def test_get_retention(self, tracker):
         """リテンション分析テスト"""
         today = datetime.now(UTC)
@@ -597,6 +817,19 @@ class TestAnalyticsTracker:
         retention = tracker.get_retention(cohort_date=today, periods=3)
         assert retention["cohort_size"] >= 0
 
+    def test_get_retention_by_day(self, tracker):
+        """リテンション分析（日別の継続ユーザー数）テスト"""
+        cohort = datetime(2026, 1, 1, 12, 0, tzinfo=UTC)
+        tracker.track_event(EventType.LOGIN, user_id="user_1", timestamp=cohort)
+        tracker.track_event(EventType.LOGIN, user_id="user_2", timestamp=cohort)
+        tracker.track_event(EventType.LOGIN, user_id="user_1", timestamp=cohort + timedelta(days=1))
+        tracker.track_event(EventType.LOGIN, user_id="user_3", timestamp=cohort + timedelta(days=1))
+
+        retention = tracker.get_retention(cohort_date=cohort, periods=2)
+        assert retention["cohort_size"] == 2
+        assert [r["retained_users"] for r in retention["retention"]] == [2, 1, 0]
+        assert retention["retention"][1]["retention_rate"] == 50.0
+
     def test_delete_events(self, tracker):
         """イベント削除テスト"""
         tracker.track_event(EventType.PAGE_VIEW, user_id="user_1")
@@ -606,6 +839,48 @@ class TestAnalyticsTracker:
         assert deleted == 1
         assert len(tracker._events) == 1
 
+    def test_delete_events_user_and_before_date(self, tracker):
+        """ユーザーと日時を同時に指定した削除テスト"""
+        base = datetime(2026, 1, 1, tzinfo=UTC)
+        for day in range(1, 11):
+            tracker.track_event(
+                EventType.PAGE_VIEW,
+                user_id="a" if day <= 5 else "b",
+                timestamp=base + timedelta(days=day),
+            )
+
+        deleted = tracker.delete_events(user_id="a", before_date=base + timedelta(days=8))
+
+        assert deleted == 7
+        remaining = tracker.get_events()
+        assert sorted(e.timestamp.day for e in remaining) == [9, 10, 11]
+        assert len(tracker.get_events(start_date=base + timedelta(days=9))) == 2
+
+    def test_max_events_evicts_oldest(self):
+        """イベント上限超過時に古いイベントが削除されるテスト"""
+        tracker = AnalyticsTracker(max_events=10)
+        for i in range(25):
+            tracker.track_event(EventType.PAGE_VIEW, user_id=f"user_{i}")
+
+        assert len(tracker._events) <= 10
+        assert tracker.get_events(user_id="user_0") == []
+        assert len(tracker.get_events(user_id="user_24")) == 1
+        # 日次統計は削除されたイベントも含む
+        assert sum(day["total_events"] for day in tracker.get_daily_stats()) == 25
+
+    def test_get_events_after_delete(self, tracker):
+        """削除後もインデックス経由の検索結果が一致するテスト"""
+        tracker.track_event(EventType.PAGE_VIEW, user_id="user_1")
+        tracker.track_event(EventType.PURCHASE, user_id="user_1")
+        tracker.track_event(EventType.PURCHASE, user_id="user_2")
+
+        tracker.delete_events(user_id="user_1")
+
+        assert tracker.get_events(user_id="user_1") == []
+        purchases = tracker.get_events(event_type=EventType.PURCHASE)
+        assert [e.user_id for e in purchases] == ["user_2"]
+        assert len(tracker.get_events(user_id="user_2", event_type=EventType.PURCHASE)) == 1
+
 
 # ==================== APIエンドポイントテスト ====================
 
@@ -619,7 +894,9 @@ class TestAnalyticsAPI:
         assert response.status_code == 200
         data = response.json()
         assert "event_types" in data
-        assert len(data["event_types"]) > 0
+        assert len(data["event_types"]) == len(EventType)
+        assert {"value": "page_view", "name": "PAGE_VIEW"} in data["event_types"]
+        assert response.headers["content-type"] == "application/json"
 
     def test_track_event(self):
         """イベント記録APIテスト"""
@@ -637,6 +914,22 @@ class TestAnalyticsAPI:
         assert data["event_type"] == "page_view"
         assert data["user_id"] == "test_user_123"
 
+    def test_tracker_dependency_override(self):
+        """トラッカーの依存関係を差し替えられることのテスト"""
+        tracker = AnalyticsTracker()
+        app.dependency_overrides[get_analytics_tracker] = lambda: tracker
+        try:
+            response = client.post(
+                "/api/v1/analytics/events",
+                json={"event_type": "page_view", "user_id": "override_user"},
+            )
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 201
+        assert [e.id for e in tracker.get_events()] == [response.json()["id"]]
+        assert get_analytics_tracker().get_events(user_id="override_user") == []
+
     def test_list_events(self):
         """イベント一覧取得APIテスト"""
         response = client.get("/api/v1/analytics/events")
@@ -720,6 +1013,25 @@ class TestABTestAPI:
         assert response.status_code == 201
         data = response.json()
         assert len(data["variants"]) == 2
+        # 検証を省いたレスポンスもスキーマどおりのフィールドだけを返す
+        expected = ABTestResponse.model_validate(data).model_dump(mode="json")
+        assert data == expected
+        assert response.headers["content-type"] == "application/json"
+
+    def test_ab_test_response_float_fields(self):
+        """float のフィールドは値が0でも float として返る"""
+        for variants in ([], [{"name": "A", "weight": 100}]):
+            response = client.post(
+                "/api/v1/analytics/ab-tests",
+                json={"name": "float型テスト", "variants": variants},
+            )
+            assert response.status_code == 201
+            data = json.loads(response.content)
+            assert isinstance(data["total_revenue"], float)
+            assert isinstance(data["confidence_level"], float)
+            for variant in data["variants"]:
+                for field_name in ("weight", "revenue", "conversion_rate", "revenue_per_impression"):
+                    assert isinstance(variant[field_name], float), field_name
 
     def test_list_ab_tests(self):
         """A/Bテスト一覧取得APIテスト"""
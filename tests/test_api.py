@@ -481,6 +481,29 @@ class TestSchemas:
             EstimateRequest(prompt_count=1001)
 
 
+class TestPackageExports:
+    """パッケージ公開名（遅延読み込み）のテスト"""
+
+    def test_api_package_exports(self):
+        """src.api からスキーマを取得できる"""
+        import src.api
+        from src.api import GenerateRequest as PkgGenerateRequest
+
+        assert PkgGenerateRequest is GenerateRequest
+        assert "app" not in src.api.__all__
+        with pytest.raises(AttributeError):
+            src.api.NoSuchName
+
+    def test_admin_package_exports(self):
+        """src.api.admin から router とダッシュボードを取得できる"""
+        from src.api.admin import AdminDashboard, admin_router
+        from src.api.admin.dashboard import AdminDashboard as DashboardCls
+        from src.api.admin.routes import router
+
+        assert admin_router is router
+        assert AdminDashboard is DashboardCls
+
+
 class TestErrorHandling:
     """エラーハンドリングのテスト"""
 